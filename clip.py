@@ -0,0 +1,144 @@
+"""
+Incident clips: a per-camera ring buffer of recently processed frames, JPEG-encoded, that an alert turns into a short
+pre-/post-event mp4 written and uploaded off the detection loop.
+
+Usage:
+    clips = ClipRecorder(uploader, pre=5, post=3, fps=10, camera=0)
+    clips.add(im0)  # every decoded frame, also motion-gated ones, encoded off the caller's thread at up to 10 frames/s
+    clips.trigger('fire', 'fire_20240101_120000_1.mp4', 'fire_clip')  # 5 s before + 3 s after, uploaded when done
+    clips.close()  # finish clips still waiting for post-event frames
+"""
+
+import os
+import queue
+import tempfile
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from metrics import STAGE
+from snapshot import SnapshotEncoder
+from utils.general import LOGGER, cv2
+
+
+class ClipRecorder:
+    # Keeps pre seconds of encoded frames per camera. A triggered clip collects post seconds more, then a thread decodes
+    # the frames into an mp4 and hands it to the IncidentUploader. JPEG encoding runs on a per-camera worker thread
+    def __init__(self, uploader, pre=5.0, post=3.0, fps=10.0, quality=70, max_size=640, camera=0, grace=1.0,
+                 backlog=8):
+        self.uploader = uploader
+        self.pre, self.post = pre, post  # seconds before and after the alert
+        self.grace = grace  # seconds past a clip's end after which a timer finishes it, i.e. when frames stop coming
+        self.interval = 1 / fps if fps else 0  # min seconds between buffered frames, bounds the encode load
+        self.encoder = SnapshotEncoder(quality, max_size)
+        self.camera = str(camera)  # metrics label
+        self.buffer = deque()  # (capture time, jpeg bytes), oldest first
+        self.clips = []  # clips collecting post-event frames
+        self.threads = []
+        self.lock = threading.Lock()  # buffer and clips are shared with the encoder thread and the finishing timers
+        self.last = -float('inf')  # capture time of the last queued frame
+        self.frames = queue.Queue(maxsize=backlog)  # (capture time, BGR frame) waiting to be encoded
+        self.dropped = 0  # frames not buffered because the encoder fell behind
+        self.worker = threading.Thread(target=self._encode, daemon=True)
+        self.worker.start()
+
+    def add(self, im0, t=None):
+        """Queue BGR frame im0 captured at time t for the buffer if it is due. im0 must not be modified afterwards."""
+        t = time.time() if t is None else t
+        if t - self.last >= self.interval:
+            self.last = t
+            try:
+                self.frames.put_nowait((t, im0))
+            except queue.Full:
+                self.dropped += 1  # a gap in the clip rather than a stall in the detection loop
+
+    def _encode(self):
+        # Encoder thread: buffer frames in capture order and finish clips whose post-event time has passed
+        while True:
+            item = self.frames.get()
+            if item is None:
+                break
+            t, im0 = item
+            with STAGE.time(self.camera, 'clip'):
+                frame = t, self.encoder(im0)
+            with self.lock:
+                self.buffer.append(frame)
+                while self.buffer and self.buffer[0][0] < t - self.pre:
+                    self.buffer.popleft()
+                for clip in self.clips:
+                    clip['frames'].append(frame)
+                done = [x for x in self.clips if t >= x['until']]
+                for clip in done:
+                    self.clips.remove(clip)
+            for clip in done:
+                self._finish(clip)
+
+    def trigger(self, kind, name, prefix, t0=None):
+        """Start a clip of the buffered frames plus the next post seconds, uploaded to '<prefix>/<name>'."""
+        t0 = time.time() if t0 is None else t0
+        clip = {'kind': kind, 'name': name, 'prefix': prefix, 't0': t0, 'until': t0 + self.post}
+        with self.lock:
+            clip['frames'] = list(self.buffer)
+            self.clips.append(clip)
+        timer = threading.Timer(max(clip['until'] - time.time(), 0) + self.grace, self._expire, (clip,))
+        timer.daemon = True
+        timer.start()
+
+    def _expire(self, clip):
+        # Timer fallback: finish a clip with the frames it has if no frame past its end arrived, i.e. a stalled camera
+        with self.lock:
+            if clip not in self.clips:
+                return  # already finished by the encoder thread or close()
+            self.clips.remove(clip)
+        self._finish(clip)
+
+    def _finish(self, clip):
+        thread = threading.Thread(target=self._write, args=(clip,), daemon=True)
+        thread.start()
+        with self.lock:
+            self.threads = [x for x in self.threads if x.is_alive()] + [thread]
+
+    def _write(self, clip):
+        frames = clip['frames']
+        if not frames:
+            return
+        fd, f = tempfile.mkstemp(suffix='.mp4')
+        os.close(fd)
+        try:
+            duration = frames[-1][0] - frames[0][0]
+            fps = (len(frames) - 1) / duration if duration > 0 else 1 / (self.interval or 0.1)
+            writer = None
+            for _, jpg in frames:
+                im = cv2.imdecode(np.frombuffer(jpg, dtype=np.uint8), cv2.IMREAD_COLOR)
+                if writer is None:
+                    h, w = im.shape[:2]
+                    writer = cv2.VideoWriter(f, cv2.VideoWriter_fourcc(*'mp4v'), fps, (w, h))
+                elif im.shape[:2] != (h, w):  # camera resolution changed mid-clip
+                    im = cv2.resize(im, (w, h))
+                writer.write(im)
+            writer.release()
+            with open(f, 'rb') as fh:
+                data = fh.read()
+            self.uploader.submit(clip['kind'], clip['name'], data, clip['prefix'], camera=self.camera, t0=clip['t0'],
+                                 content_type='video/mp4')
+        except Exception as e:
+            LOGGER.warning(f"WARNING ⚠️ clip {clip['name']} failed: {e}")
+        finally:
+            os.remove(f)
+
+    def close(self, timeout=10.0):
+        """Encode queued frames, finish pending clips with the frames collected so far and wait for their uploads to be
+        queued."""
+        deadline = time.time() + timeout
+        self.frames.put(None)
+        self.worker.join(max(deadline - time.time(), 0.1))
+        with self.lock:
+            clips, self.clips = self.clips, []
+        for clip in clips:
+            self._finish(clip)
+        with self.lock:
+            threads = list(self.threads)
+        for t in threads:
+            t.join(max(deadline - time.time(), 0.1))
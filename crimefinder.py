@@ -1,26 +1,186 @@
-from pathlib import Path
-import torch
+"""
+CrimeFinder worker: one warm, supervised process that keeps the model loaded, restarts stalled camera streams and
+hot-swaps best.pt in the background when it changes on disk.
+
+Usage:
+    $ python crimefinder.py                                                    # settings below
+    $ python crimefinder.py --source URL1 URL2 --weights best.pt --metrics-port 8000  # GET :8000/health, /metrics
+    $ python crimefinder.py --weights best_openvino_model                             # CPU node, see edge_export.py
+
+    worker = CrimeFinder(['http://10.50.9.134:8090/?action=stream'], weights='best.pt', imgsz=416).start()
+    worker.health()  # {'healthy': True, 'serving': True, 'weights': 'best.pt', 'cameras': {0: {...}}, ...}
+    worker.stop()
+"""
+
+import argparse
+import sys
+import threading
 import time
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
 
-detect_script_path = Path('C:/Users/minki/Desktop/Projects/yolov5-master/yolov5-master/detect.py')  # 적절한 경로로 변경
+from utils.general import LOGGER, print_args
+
+from clip import ClipRecorder
+from events import IncidentPipeline
+from motion import MotionGate
+from rules import load_rules
+from server import InferenceServer
+from snapshot import SnapshotAnnotator
 
 # 파라미터 설정
-weights = 'best.pt'
+weights = ROOT / 'best.pt'
 conf = 0.5
 img_size = 416
 source = "http://10.50.9.134:8090/?action=stream"
 # "http://192.168.43.248:8090/?action=stream"
-# 파이썬 스크립트 실행
-with torch.no_grad():
-    command = f'python {detect_script_path} --weights {weights} --conf {conf} --img {img_size} --source {source}'
+
+
+class CrimeFinder:
+    # Long-running detection worker. Firebase and the model are initialized once; streams and weights are replaced
+    # while it keeps serving
+    def __init__(
+            self,
+            sources,  # camera stream URLs or webcam ids
+            weights=weights,  # model path, watched for changes
+            conf_thres=conf,  # confidence threshold
+            imgsz=img_size,  # inference size (pixels)
+            rules=ROOT / 'data/rules.yaml',  # alert rules YAML/JSON
+            stream_fps=0,  # max frames/s processed per camera, 0 for all
+            motion_thres=0.0,  # changed-pixel fraction that runs the model, 0 to infer on every frame
+            motion_keyframe=2.0,  # max seconds between inferences while the scene is static
+            clips=True,  # record and upload a pre-/post-event mp4 per alert
+            journal=ROOT / 'runs/journal.db',  # local incident journal (SQLite), '' to disable
+            stale=10.0,  # seconds without a frame before a camera is restarted and reported unhealthy
+            interval=2.0,  # seconds between supervision checks
+            watch=True,  # reload weights when the file changes
+            incidents=None,  # other events.IncidentPipeline arguments, i.e. upload_workers, db_interval
+            annotate=True,  # draw the alert's boxes on incident snapshots
+            **kwargs,  # other InferenceServer arguments, i.e. device, half, max_batch
+    ):
+        from detect import app, bucket, db  # initializes firebase_admin once per process
+
+        self.ruleset = load_rules(rules)
+        self.incidents = IncidentPipeline(bucket, db, self.ruleset.rules, journal, **(incidents or {}))
+        self.uploader, self.journal = self.incidents.uploader, self.incidents.journal
+        self.server = InferenceServer(weights, imgsz=(imgsz, imgsz), conf_thres=conf_thres, ruleset=self.ruleset,
+                                      **kwargs)
+        annotator = SnapshotAnnotator(self.server.model.names) if annotate else None
+        self.clips = [ClipRecorder(self.uploader, camera=i) if clips else None for i in range(len(sources))]
+        for i, s in enumerate(sources):
+            handler = self.incidents.handler(camera=i, annotate=annotator, clips=self.clips[i])
+            gate = MotionGate(motion_thres, motion_keyframe, camera=i) if motion_thres else None
+            self.server.add_camera(s, handler, fps=stream_fps, gate=gate, clips=self.clips[i])
+        self.weights, self.watch = Path(weights), watch
+        self.mtime = self.candidate = self._mtime()  # loaded and last seen weights mtime
+        self.stale, self.interval = stale, interval
+        self.restarted = {}  # camera -> last restart time
+        self.running, self.thread = False, None
+        app.state.health = self.health  # GET /health
+
+    def _mtime(self):
+        try:
+            return self.weights.stat().st_mtime
+        except OSError:
+            return None
+
+    def health(self):
+        """Return the server health report with upload and journal backlogs."""
+        return {**self.server.health(self.stale), 'uploads': self.uploader.metrics(),
+                'journal': self.journal.stats() if self.journal else None}
+
+    def check(self):
+        """One supervision pass: revive the serving thread, restart stalled streams and reload changed weights."""
+        if not self.server.thread.is_alive():
+            LOGGER.warning('WARNING ⚠️ Serving thread stopped, restarting')
+            self.server.start()
+        now = time.time()
+        for cam, c in self.server.stats().items():
+            if c['age'] > self.stale and now - self.restarted.get(cam, 0) > self.stale:  # incl. no first frame
+                LOGGER.warning(f"WARNING ⚠️ Camera {cam} has no frame for {c['age']:.0f}s")
+                self.server.restart_camera(cam)  # model stays loaded, only the capture is reopened
+                self.restarted[cam] = now
+        m = self._mtime() if self.watch else None
+        if m is not None and m != self.mtime:
+            if m == self.candidate:  # unchanged since the last check, so the file is completely written
+                self.mtime = m
+                self.server.reload(self.weights)
+            self.candidate = m
+
+    def supervise(self):
+        while self.running:
+            time.sleep(self.interval)
+            try:
+                self.check()
+            except Exception as e:
+                LOGGER.warning(f'WARNING ⚠️ Supervision check failed: {e}')
+
+    def start(self):
+        self.running = True
+        self.server.start()
+        self.thread = threading.Thread(target=self.supervise, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.running = False
+        if self.thread:
+            self.thread.join(self.interval + 10)  # a check() in progress could otherwise restart the serving thread
+        self.server.stop()  # returns once the last batch is handled, before its clips and uploads are closed
+        for c in self.clips:
+            if c:
+                c.close()
+        self.incidents.close()
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--source', nargs='+', type=str, default=[source], help='camera stream URLs or webcam ids')
+    parser.add_argument('--weights', type=str, default=weights, help='.pt, .onnx or OpenVINO dir, reloaded on change')
+    parser.add_argument('--conf-thres', '--conf', type=float, default=conf, help='confidence threshold')
+    parser.add_argument('--imgsz', '--img', '--img-size', type=int, default=img_size, help='inference size (pixels)')
+    parser.add_argument('--rules', type=str, default=ROOT / 'data/rules.yaml', help='alert rules YAML/JSON path')
+    parser.add_argument('--stream-fps', type=float, default=0, help='max frames/s processed per camera, 0 for all')
+    parser.add_argument('--motion-thres', type=float, default=0, help='changed-pixel fraction to run the model, 0 off')
+    parser.add_argument('--motion-keyframe', type=float, default=2.0, help='max seconds between inferences when static')
+    parser.add_argument('--noclip', action='store_true', help='do not record incident clips')
+    parser.add_argument('--plain-snapshots', action='store_true', help='do not draw alert boxes on incident snapshots')
+    parser.add_argument('--journal', type=str, default=ROOT / 'runs/journal.db', help="incident journal, '' to disable")
+    parser.add_argument('--journal-max-mb', type=float, default=512,
+                        help='disk cap on unsent snapshots/clips, oldest dropped (counted, never uploaded), 0 off')
+    parser.add_argument('--stale', type=float, default=10.0, help='seconds without frames before a stream restart')
+    parser.add_argument('--interval', type=float, default=2.0, help='seconds between supervision checks')
+    parser.add_argument('--no-watch', action='store_true', help='do not reload weights when the file changes')
+    parser.add_argument('--device', default='', help='cuda device, i.e. 0 or 0,1,2,3 or cpu')
+    parser.add_argument('--half', action='store_true', help='use FP16 half-precision inference')
+    parser.add_argument('--max-batch', type=int, default=8, help='max frames per forward pass, 1 for static exports')
+    parser.add_argument('--metrics-port', type=int, default=0, help='serve /health and /metrics on this port, 0 off')
+    opt = parser.parse_args()
+    print_args(vars(opt))
+    return opt
+
+
+def main(opt):
+    if opt.metrics_port:
+        from detect import serve_metrics
+        serve_metrics(opt.metrics_port)
+    worker = CrimeFinder(opt.source, opt.weights, opt.conf_thres, opt.imgsz, opt.rules, opt.stream_fps,
+                         opt.motion_thres, opt.motion_keyframe, not opt.noclip, opt.journal, opt.stale,
+                         opt.interval, not opt.no_watch, {'journal_max_mb': opt.journal_max_mb},
+                         not opt.plain_snapshots, device=opt.device, half=opt.half, max_batch=opt.max_batch)
+    worker.start()
     try:
-        # subprocess 모듈을 사용하여 콘솔 명령 실행
-        import subprocess
-        process = subprocess.Popen(command, shell=True, stdout=subprocess.PIPE)
-        process.wait()
-        output, error = process.communicate()
-        print(output.decode())  # 결과 출력
-        time.sleep(0)
-
-    except Exception as e:
-        print(f"에러 발생: {e}")
\ No newline at end of file
+        while True:
+            time.sleep(60)
+            LOGGER.info(f'Health: {worker.health()}')
+    except KeyboardInterrupt:
+        worker.stop()
+
+
+if __name__ == '__main__':
+    opt = parse_opt()
+    main(opt)
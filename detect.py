@@ -30,15 +30,16 @@ Usage - formats:
 
 import argparse
 import csv
-import datetime
 import platform
 import sys
+import threading
 import keyboard  # keyboard 모듈 추가
 import time
 import firebase_admin
 import os
 from firebase_admin import credentials, db, storage
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 app = FastAPI()
 
@@ -68,6 +69,15 @@ from utils.general import (LOGGER, Profile, check_file, check_img_size, check_im
                            increment_path, non_max_suppression, print_args, scale_boxes, strip_optimizer, xyxy2xywh)
 from utils.torch_utils import select_device, smart_inference_mode
 
+from clip import ClipRecorder
+from events import IncidentPipeline
+from metrics import METRICS, STAGE, FPSMeter
+from motion import MotionGate
+from preprocess import Preprocessor
+from rules import load_rules
+from snapshot import SnapshotAnnotator
+from streams import LoadLatestStreams
+
 
 @smart_inference_mode()
 def run(
@@ -99,24 +109,43 @@ def run(
         half=False,  # use FP16 half-precision inference
         dnn=False,  # use OpenCV DNN for ONNX inference
         vid_stride=1,  # video frame-rate stride
-        # Initialize a variable to keep track of the time the message was last printed
-        violence_detect_count = 0,
-        weapon_detect_count=0,
-        fire_detect_count=0,
-        last_violence_detect_time=time.time(),
-        last_weapon_detect_time=time.time(),
-        last_fire_detect_time=time.time(),
+        upload_workers=2,  # incident upload threads
+        upload_queue=16,  # max pending incident uploads, oldest dropped when full
+        upload_retries=3,  # upload retries with exponential backoff
+        snapshot_quality=90,  # incident snapshot JPEG quality
+        snapshot_max_size=0,  # downscale incident snapshots to this longest side, 0 to keep frame size
+        snapshot_dir='',  # also keep incident snapshots on local disk, i.e. runs/detect/incidents
+        db_interval=1.0,  # seconds between coalesced RTDB updates
+        db_batch=32,  # flush RTDB early once this many paths are pending
+        latest_frame=False,  # streams: always infer on the newest frame, skipping stale ones
+        stream_fps=0,  # streams: max frames/s processed per camera with --latest-frame, 0 for all fresh frames
+        rules=ROOT / 'data/rules.yaml',  # alert rules YAML/JSON: class ids, threshold, cooldown, min frames, prefix
+        metrics_port=0,  # serve Prometheus /metrics on this port, 0 to disable
+        plain_snapshots=False,  # do not draw the alert's boxes on headless incident snapshots
+        motion_thres=0.0,  # streams: changed-pixel fraction that runs the model, 0 to infer on every frame
+        motion_keyframe=2.0,  # streams: max seconds between inferences while the scene is static
+        save_stream=False,  # streams: also write the full annotated stream to mp4
+        noclip=False,  # streams: do not record incident clips
+        clip_pre=5.0,  # streams: incident clip seconds before the alert
+        clip_post=3.0,  # streams: incident clip seconds after the alert
+        clip_fps=10.0,  # streams: incident clip frame rate
+        journal=ROOT / 'runs/journal.db',  # local incident journal (SQLite), '' to disable
+        journal_max_mb=512.0,  # disk cap on journaled payloads awaiting upload, 0 for no limit
 ):
-    dir = db.reference()  # db에 저장qq
-    dir.update({'violence_count': f'{violence_detect_count}'})
-    dir.update({'fire_count': f'{fire_detect_count}'})
-    dir.update({'weapon_count': f'{weapon_detect_count}'})
+    if metrics_port:
+        serve_metrics(metrics_port)
+    ruleset = load_rules(rules)
+    # 로컬 사건 기록 (네트워크 장애/재시작에도 유실 없음) -> db에 저장, 재시작 시 카운트 복원 -> 스토리지 업로드
+    incidents = IncidentPipeline(bucket, db, ruleset.rules, journal, journal_max_mb, upload_workers, upload_queue,
+                                 upload_retries, snapshot_quality, snapshot_max_size, snapshot_dir, db_interval,
+                                 db_batch)
     source = str(source)
     save_img = not nosave and not source.endswith('.txt')  # save inference images
     is_file = Path(source).suffix[1:] in (IMG_FORMATS + VID_FORMATS)
     is_url = source.lower().startswith(('rtsp://', 'rtmp://', 'http://', 'https://'))
     webcam = source.isnumeric() or source.endswith('.streams') or (is_url and not is_file)
     screenshot = source.lower().startswith('screen')
+    save_img &= not webcam or save_stream  # 스트림 전체 녹화는 --save-stream 일 때만, 평소엔 알림 클립
     if is_url and is_file:
         source = check_file(source)  # download
 
@@ -129,27 +158,68 @@ def run(
     model = DetectMultiBackend(weights, device=device, dnn=dnn, data=data, fp16=half)
     stride, names, pt = model.stride, model.names, model.pt
     imgsz = check_img_size(imgsz, s=stride)  # check image size
+    summarize = ruleset.summarizer(nc=len(names))
 
     # Dataloader
-    bs = 1  # batch_size
+    bs, pre = 1, None  # batch_size, preprocessing fast path
     if webcam:
         view_img = check_imshow(warn=True)
-        dataset = LoadStreams(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
+        if latest_frame:
+            dataset = LoadLatestStreams(source, fps=stream_fps, raw=True)
+            pre = Preprocessor(imgsz, model.device, model.fp16, max_batch=len(dataset), stride=stride, auto=pt)
+        else:
+            dataset = LoadStreams(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
         bs = len(dataset)
     elif screenshot:
         dataset = LoadScreenshots(source, img_size=imgsz, stride=stride, auto=pt)
     else:
         dataset = LoadImages(source, img_size=imgsz, stride=stride, auto=pt, vid_stride=vid_stride)
     vid_path, vid_writer = [None] * bs, [None] * bs
+    draw = save_img or save_crop or view_img  # 렌더링 출력이 없으면 (headless) 주석 작업 전부 생략
+    annotate = None  # 알림 스냅샷에만 경계 상자 표시 (lazy)
+    if not plain_snapshots and not draw:
+        annotate = SnapshotAnnotator(names, line_thickness, hide_labels, hide_conf)
+    clips = [ClipRecorder(incidents.uploader, clip_pre, clip_post, clip_fps, camera=i)
+             if webcam and not noclip else None for i in range(bs)]  # 카메라별 알림 전후 클립
+    handlers = [incidents.handler(camera=i, annotate=annotate, clips=clips[i]) for i in range(bs)]
+    meters = [FPSMeter(i) for i in range(bs)]
+    gates = None  # 카메라별 모션 게이트, 정지 장면은 모델 생략
+    dynamic = pre and (pt or model.jit)  # 임의의 스트림 부분집합으로 batch 가능
+    if webcam and motion_thres:
+        gates = [MotionGate(motion_thres, motion_keyframe, camera=i) for i in range(bs)]
 
     # Run inference
     model.warmup(imgsz=(1 if pt or model.triton else bs, 3, *imgsz))  # warmup
     seen, windows, dt = 0, [], (Profile(), Profile(), Profile())
     for path, im, im0s, vid_cap, s in dataset:
+        fresh = getattr(dataset, 'fresh', None)  # LoadLatestStreams: 새 프레임이 없는 카메라는 마지막 프레임 반복
+        due = [i for i in range(bs) if fresh is None or fresh[i]]  # 새 프레임이 있는 스트림 (batch index)
+        if not due:
+            continue  # 모든 카메라가 멈춤: 같은 프레임 재추론 생략
+        for i in due:
+            if clips[i]:
+                clips[i].add(im0s[i])  # 모션 게이트와 무관하게 새 프레임을 클립 버퍼에
+        active = due if dynamic else range(bs)  # 모델을 실행할 스트림, static batch 는 전체
+        if gates:
+            moved = []
+            for i in due:
+                with STAGE.time(i, 'motion'):
+                    if gates[i].check(im0s[i]):
+                        moved.append(i)
+            if dynamic or not moved:
+                active = moved  # dynamic batch: infer on the moving streams only
+            for i in due:
+                gates[i].record(i in active)  # skip 카운트는 실제로 모델을 생략한 프레임만
+            if not active:
+                continue  # 모든 카메라가 정지 장면: 모델 생략
+
         with dt[0]:
-            im = torch.from_numpy(im).to(model.device)
-            im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
-            im /= 255  # 0 - 255 to 0.0 - 1.0
+            if pre:
+                im = pre([im0s[i] for i in active])  # letterbox, RGB, BCHW, 0.0 - 1.0 into preallocated buffers
+            else:
+                im = torch.from_numpy(im).to(model.device)
+                im = im.half() if model.fp16 else im.float()  # uint8 to fp16/32
+                im /= 255  # 0 - 255 to 0.0 - 1.0
             if len(im.shape) == 3:
                 im = im[None]  # expand for batch dim
 
@@ -161,6 +231,9 @@ def run(
         # NMS
         with dt[2]:
             pred = non_max_suppression(pred, conf_thres, iou_thres, classes, agnostic_nms, max_det=max_det)
+        for i in active:  # batch stages count towards every camera in the batch
+            for x, stage in zip(dt, ('preprocess', 'inference', 'nms')):
+                STAGE.observe(x.dt, i, stage)
 
         # Second-stage classifier (optional)
         # pred = utils.general.apply_classifier(pred, classifier_model, im, im0s)
@@ -178,127 +251,62 @@ def run(
                 writer.writerow(data)
 
         # Process predictions
-        for i, det in enumerate(pred):  # 이미지별로 반복
+        for i, det in zip(active, pred):  # 이미지별로 반복
+            if i not in due:
+                continue  # static batch 에 채워진 반복 프레임: 핸들러/클립/카운트 제외
             seen += 1
+            t1 = time.perf_counter()
             if webcam:  # batch_size >= 1
-                p, im0, frame = path[i], im0s[i].copy(), dataset.count
+                p, im0, frame = path[i], im0s[i].copy() if draw else im0s[i], dataset.count  # 그릴 때만 복사
                 # s += f'{i}: '  # 이 줄을 주석 처리하여 해당 라인의 출력을 차단
             else:
-                p, im0, frame = path, im0s.copy(), getattr(dataset, 'frame', 0)
+                p, im0, frame = path, im0s.copy() if draw else im0s, getattr(dataset, 'frame', 0)
 
             p = Path(p)  # 경로를 Path 객체로 변환
             save_path = str(save_dir / p.name)  # 이미지 저장 경로 (im.jpg)
             txt_path = str(save_dir / 'labels' / p.stem) + (
                 '' if dataset.mode == 'image' else f'_{frame}')  # 레이블 파일 경로 (im.txt)
-            s += '%gx%g ' % im.shape[2:]  # 화면 크기 출력 문자열
-            gn = torch.tensor(im0.shape)[[1, 0, 1, 0]]  # 정규화 gain (whwh)
             imc = im0.copy() if save_crop else im0  # 크롭된 이미지 저장을 위한 복사
-            annotator = Annotator(im0, line_width=line_thickness, example=str(names))
+            annotator = Annotator(im0, line_width=line_thickness, example=str(names)) if draw else None
             if len(det):
                 # 이미지 크기에서 im0 크기로 상자 크기 재조정
                 det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
 
-                # Print results
-                for c in det[:, 5].unique():
-                    n = (det[:, 5] == c).sum()  # 클래스별 탐지 수
-                    s += f"{n} {names[int(c)]}{'s' * (n > 1)}, "  # 문자열에 추가
-
-                # Write results
-                for *xyxy, conf, cls in reversed(det):
+            # Write results
+            summary = summarize(det)  # 무시 클래스 제거, 규칙별 최대 인식률
+            if len(summary.det) and (save_csv or save_txt or draw):
+                rows = summary.det.tolist()
+                if save_txt:
+                    gn = torch.tensor(im0.shape, device=det.device)[[1, 0, 1, 0]]  # 정규화 gain (whwh)
+                    xywhs = (xyxy2xywh(summary.det[:, :4]) / gn).tolist()  # 정규화된 xywh
+                for j in reversed(range(len(rows))):
+                    *xyxy, conf, cls = rows[j]
                     c = int(cls)  # 정수형 클래스
-                    if c!= 1 and c!= 2 and c != 6  :  # 사람, 스워드 , 총, 비폭력, 강도마스크 인식 X
-                        label = names[c] if hide_conf else f'{names[c]}'
-                        confidence = float(conf)
-                        confidence_str = f'{confidence:.2f}'
-
-                        if save_csv:
-                            write_to_csv(p.name, label, confidence_str)
-
-                        if save_txt:  # 파일에 저장
-                            xywh = (xyxy2xywh(torch.tensor(xyxy).view(1, 4)) / gn).view(-1).tolist()  # 정규화된 xywh
-                            line = (cls, *xywh, conf) if save_conf else (cls, *xywh)  # 레이블 형식
-                            with open(f'{txt_path}.txt', 'a') as f:
-                                f.write(('%g ' * len(line)).rstrip() % line + '\n')
-
-                        if save_img or save_crop or view_img:  # 이미지에 경계 상자 추가
-                            label = None if hide_labels else (names[c] if hide_conf else f'{names[c]} {conf:.2f}')
-                            annotator.box_label(xyxy, label, color=colors(c, True))
-                        if save_crop:
-                            save_one_box(xyxy, imc, file=save_dir / 'crops' / names[c] / f'{p.stem}.jpg', BGR=True)
-
-                        if c == 7:  # "폭력인식 ( 순간 캡쳐 저장 -> 파이어베이스 스토리지에 저장 |  DB에 count 전송 )
-                            current_time = time.time()
-                            confidence = float(conf) # 인식률
-                            if current_time - last_violence_detect_time >= 10 and confidence >= 0.55:
-                                violence_detect_count += 1
-                                LOGGER.info(f"Violence detect : {violence_detect_count} count")
-                                last_violence_detect_time = current_time  # Update the last detection time
-
-                                current_datetime = datetime.datetime.now()
-                                formatted_datetime = current_datetime.strftime("%Y%m%d_%H%M%S")
-                                frame_dir = r'C:\Users\minki\Desktop\Projects\yolov5-master\yolov5-master\runs\detect\violence_img'
-                                frame_name = f"violence_{formatted_datetime}_{violence_detect_count}.jpg"
-                                frame_path = os.path.join(frame_dir, frame_name)
-                                cv2.imwrite(frame_path, im0)
-                                frame_img = frame_dir + "\\" + frame_name
-                                post_image(frame_img, frame_name, "violence")
-
-                                # Firebase Realtime Database에 파일 이름 저장
-                                db.reference('violence_img').push().set({
-                                    'file_name': frame_name
-                                })
-
-                                db.reference().update({'violence_count': f'{violence_detect_count}'})
-
-                        elif c in [5, 8]:  # "흉기 ( 순간 캡쳐 저장 -> 파이어베이스 스토리지에 저장 | DB에 count 전송 )
-                            current_time = time.time()
-                            confidence = float(conf)  # 인식률
-                            if current_time - last_weapon_detect_time >= 10 and confidence >= 0.5:  # Check if 10 seconds have passed
-                                weapon_detect_count += 1
-                                LOGGER.info(f"Weapon detect : {weapon_detect_count} count")
-                                last_weapon_detect_time = current_time  # Update the last detection time
-
-                                current_datetime = datetime.datetime.now()
-                                formatted_datetime = current_datetime.strftime("%Y%m%d_%H%M%S")
-                                frame_dir = r'C:\Users\minki\Desktop\Projects\yolov5-master\yolov5-master\runs\detect\weapon_img'
-                                frame_name = f"weapon_{formatted_datetime}_{weapon_detect_count}.jpg"
-                                frame_path = os.path.join(frame_dir, frame_name)
-                                cv2.imwrite(frame_path, im0)
-                                frame_img = frame_dir + "\\" + frame_name
-                                post_image(frame_img, frame_name, "weapon")
-
-                                # Firebase Realtime Database에 파일 이름 저장
-                                db.reference('weapon_img').push().set({
-                                    'file_name': frame_name
-                                })
-
-                                db.reference().update({'weapon_count': f'{weapon_detect_count}'})
-
-                        elif c in [0, 4]:  # "화재 ( 순간 캡쳐 저장 -> 파이어베이스 스토리지에 저장 | DB에 count 전송 )
-                            current_time = time.time()
-                            confidence = float(conf)  # 인식률
-                            if current_time - last_fire_detect_time >= 10 and confidence >= 0.5:  # Check if 10 seconds have passed
-                                fire_detect_count += 1
-                                LOGGER.info(f"Fire detect : {fire_detect_count} count")
-                                last_fire_detect_time = current_time  # Update the last detection time
-
-                                current_datetime = datetime.datetime.now()
-                                formatted_datetime = current_datetime.strftime("%Y%m%d_%H%M%S")
-                                frame_dir = r'C:\Users\minki\Desktop\Projects\yolov5-master\yolov5-master\runs\detect\fire_img'
-                                frame_name = f"fire_{formatted_datetime}_{fire_detect_count}.jpg"
-                                frame_path = os.path.join(frame_dir, frame_name)
-                                cv2.imwrite(frame_path, im0)
-                                frame_img = frame_dir + "\\" + frame_name
-                                post_image(frame_img, frame_name, "fire")
-
-                                # Firebase Realtime Database에 파일 이름 저장
-                                db.reference('fire_img').push().set({
-                                    'file_name': frame_name
-                                })
-
-                                db.reference().update({'fire_count': f'{fire_detect_count}'})
+                    label = names[c] if hide_conf else f'{names[c]}'
+
+                    if save_csv:
+                        write_to_csv(p.name, label, f'{conf:.2f}')
+
+                    if save_txt:  # 파일에 저장
+                        line = (cls, *xywhs[j], conf) if save_conf else (cls, *xywhs[j])  # 레이블 형식
+                        with open(f'{txt_path}.txt', 'a') as f:
+                            f.write(('%g ' * len(line)).rstrip() % line + '\n')
+
+                    if draw:  # 이미지에 경계 상자 추가
+                        label = None if hide_labels else (names[c] if hide_conf else f'{names[c]} {conf:.2f}')
+                        annotator.box_label(xyxy, label, color=colors(c, True))
+                    if save_crop:
+                        save_one_box(summary.det[j, :4], imc, file=save_dir / 'crops' / names[c] / f'{p.stem}.jpg',
+                                     BGR=True)
+
+            handlers[i](im0, summary)  # 폭력/흉기/화재 -> 스토리지 업로드 | DB에 count 전송 (탐지 없는 프레임 포함)
+
+            STAGE.observe(time.perf_counter() - t1, i, 'postprocess')
+            meters[i].tick()
 
             # Stream results
+            if not draw:
+                continue  # headless: no window, video or image output for this frame
             im0 = annotator.result()
             if view_img:
                 if platform.system() == 'Linux' and p not in windows:
@@ -328,32 +336,48 @@ def run(
                     vid_writer[i].write(im0)
 
     # Print results
-    t = tuple(x.t / seen * 1E3 for x in dt)  # speeds per image
+    t = tuple(x.t / max(seen, 1) * 1E3 for x in dt)  # speeds per image, every frame may have been gated
     LOGGER.info(f'Speed: %.1fms pre-process, %.1fms inference, %.1fms NMS per image at shape {(1, 3, *imgsz)}' % t)
+    if isinstance(dataset, LoadLatestStreams):
+        LOGGER.info(f'Stream frames: {dataset.stats()}')
+    if gates:
+        LOGGER.info(f'Motion gate: {[g.stats() for g in gates]}')
     if save_txt or save_img:
         s = f"\n{len(list(save_dir.glob('labels/*.txt')))} labels saved to {save_dir / 'labels'}" if save_txt else ''
         LOGGER.info(f"Results saved to {colorstr('bold', save_dir)}{s}")
 
+    for c in clips:
+        if c:
+            c.close()
+    incidents.close()
     if update:
         strip_optimizer(weights[0])  # update model (to fix SourceChangeWarning)
 
-@app.post("/image")
-def post_image(frame_img, frame_name, mode):
-    # Open the image file
-    with open(frame_img, "rb") as image_file:
-        # Upload the image to Firebase Storage
-        if mode == "violence" : # violence
-            blob = bucket.blob(f'violence_img/{frame_name}')  # Set the destination path in Firebase Storage
-        elif mode == "weapon" : # weapone
-            blob = bucket.blob(f'weapon_img/{frame_name}')
-        elif mode == "fire" : # fire and gas
-            blob = bucket.blob(f'fire_img/{frame_name}')
-        else:
-            LOGGER.info("post_image mode error")
-        LOGGER.info(f"Data DB trasferring success, file name : {frame_name}")
-        blob.upload_from_file(image_file, content_type="image/jpeg")  # Use the correct content_type for your image
 
-    return True
+@app.get("/metrics")
+def get_metrics():
+    # Prometheus scrape endpoint: per-camera stage latency histograms, fps, queue depths and incident counts
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/health")
+def get_health():
+    # Worker health report, 503 once the model loop or a camera goes stale. crimefinder.py sets app.state.health
+    health = getattr(app.state, 'health', None)
+    if health is None:
+        return JSONResponse({'healthy': None})
+    h = health()
+    return JSONResponse(h, status_code=200 if h['healthy'] else 503)
+
+
+def serve_metrics(port):
+    # Serve the FastAPI app (/metrics, /health) on a daemon thread next to the detection loop
+    check_requirements('uvicorn')
+    import uvicorn
+    threading.Thread(target=uvicorn.run, args=(app,), kwargs={'host': '0.0.0.0', 'port': port, 'log_level': 'warning'},
+                     daemon=True).start()
+    LOGGER.info(f"Metrics served at http://0.0.0.0:{port}/metrics")
+
 
 def parse_opt():
     parser = argparse.ArgumentParser()
@@ -385,6 +409,29 @@ def parse_opt():
     parser.add_argument('--half', action='store_true', help='use FP16 half-precision inference')
     parser.add_argument('--dnn', action='store_true', help='use OpenCV DNN for ONNX inference')
     parser.add_argument('--vid-stride', type=int, default=1, help='video frame-rate stride')
+    parser.add_argument('--upload-workers', type=int, default=2, help='incident upload threads')
+    parser.add_argument('--upload-queue', type=int, default=16, help='max pending incident uploads')
+    parser.add_argument('--upload-retries', type=int, default=3, help='incident upload retries')
+    parser.add_argument('--snapshot-quality', type=int, default=90, help='incident snapshot JPEG quality')
+    parser.add_argument('--snapshot-max-size', type=int, default=0, help='incident snapshot longest side, 0 to keep')
+    parser.add_argument('--snapshot-dir', default='', help='also save incident snapshots to this directory')
+    parser.add_argument('--db-interval', type=float, default=1.0, help='seconds between coalesced RTDB updates')
+    parser.add_argument('--db-batch', type=int, default=32, help='flush RTDB early at this many pending paths')
+    parser.add_argument('--latest-frame', action='store_true', help='streams: infer on newest frame, skip stale ones')
+    parser.add_argument('--stream-fps', type=float, default=0, help='streams: max frames/s per camera, 0 for all')
+    parser.add_argument('--rules', type=str, default=ROOT / 'data/rules.yaml', help='alert rules YAML/JSON path')
+    parser.add_argument('--metrics-port', type=int, default=0, help='serve Prometheus /metrics on this port, 0 off')
+    parser.add_argument('--plain-snapshots', action='store_true', help='do not draw alert boxes on incident snapshots')
+    parser.add_argument('--motion-thres', type=float, default=0, help='streams: motion fraction to run model, 0 off')
+    parser.add_argument('--motion-keyframe', type=float, default=2.0, help='streams: max seconds between inferences')
+    parser.add_argument('--save-stream', action='store_true', help='streams: save full annotated video, not just clips')
+    parser.add_argument('--noclip', action='store_true', help='streams: do not record incident clips')
+    parser.add_argument('--clip-pre', type=float, default=5.0, help='streams: incident clip seconds before the alert')
+    parser.add_argument('--clip-post', type=float, default=3.0, help='streams: incident clip seconds after the alert')
+    parser.add_argument('--clip-fps', type=float, default=10.0, help='streams: incident clip frame rate')
+    parser.add_argument('--journal', type=str, default=ROOT / 'runs/journal.db', help="incident journal, '' to disable")
+    parser.add_argument('--journal-max-mb', type=float, default=512,
+                        help='disk cap on unsent snapshots/clips, oldest dropped (counted, never uploaded), 0 off')
     opt = parser.parse_args()
     opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
     print_args(vars(opt))
@@ -0,0 +1,227 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""
+Export CrimeFinder weights for CPU edge nodes (ONNX Runtime, OpenVINO, optionally INT8-calibrated on site frames) and
+compare every exported model against the PyTorch reference per alert category.
+
+Usage:
+    $ python edge_export.py --weights best.pt --img 416 --include onnx openvino --val site/val
+    $ python edge_export.py --weights best.pt --img 416 --include onnx openvino --int8 --calib site/calib --val site/val
+
+    $ python crimefinder.py --weights best_openvino_model --img 416  # serve the chosen export, batch 1 unless --dynamic
+
+Outputs (next to the weights):
+    best.onnx, best-int8.onnx              # ONNX Runtime, FP32 and INT8 (onnxruntime static quantization)
+    best_openvino_model/                   # OpenVINO IR, INT8 when --int8 (NNCF calibration via export.py)
+
+The report (runs/export/report.json) holds, per model, p50/p95 latency, speedup and for each rule category the frame-
+and box-level recall/precision with the PyTorch model's detections as reference. A model passes when every
+category keeps at least --min-recall of the reference detections.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import yaml
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.common import DetectMultiBackend
+from utils.dataloaders import IMG_FORMATS
+from utils.general import LOGGER, check_img_size, check_requirements, cv2, non_max_suppression, print_args, scale_boxes
+from utils.metrics import box_iou
+from utils.torch_utils import select_device, smart_inference_mode
+
+from preprocess import Preprocessor
+from rules import load_rules
+
+
+def images(path, n=0):
+    """Return up to n (0 for all) sorted image files under directory path."""
+    files = sorted(x for x in Path(path).rglob('*.*') if x.suffix[1:].lower() in IMG_FORMATS)
+    assert files, f'no images found in {path}'
+    return files[:n] if n else files
+
+
+def calib_yaml(calib, names, save_dir):
+    """Write a dataset YAML pointing at calibration frames, as export.py --int8 --data expects for OpenVINO."""
+    f = Path(save_dir) / 'calib.yaml'
+    f.parent.mkdir(parents=True, exist_ok=True)
+    f.write_text(yaml.safe_dump({'path': str(Path(calib).resolve()), 'train': '.', 'val': '.', 'names': names}))
+    return f
+
+
+def quantize_onnx(f, calib, imgsz, n=300):
+    """Statically quantize ONNX model f to INT8 with ONNX Runtime, calibrated on up to n frames. Returns the path."""
+    check_requirements('onnxruntime')
+    from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_static
+
+    class Reader(CalibrationDataReader):
+        # Calibration batches preprocessed exactly as at inference time
+        def __init__(self):
+            import onnx
+            self.input = onnx.load(str(f)).graph.input[0].name
+            self.pre, self.files = Preprocessor(imgsz), iter(images(calib, n))
+
+        def get_next(self):
+            file = next(self.files, None)
+            return None if file is None else {self.input: self.pre([cv2.imread(str(file))]).numpy().copy()}
+
+    q = Path(f).with_name(f'{Path(f).stem}-int8.onnx')
+    LOGGER.info(f'ONNX Runtime INT8: calibrating on {calib}...')
+    quantize_static(str(f), str(q), Reader(), quant_format=QuantFormat.QDQ, per_channel=True,
+                    activation_type=QuantType.QUInt8, weight_type=QuantType.QInt8)
+    return q
+
+
+@smart_inference_mode()
+def predict(model, files, imgsz, conf_thres, iou_thres, summarize):
+    """Run model over files one frame at a time. Returns per-frame postprocess.Summary and latencies in ms."""
+    pre = Preprocessor(imgsz, model.device, model.fp16)
+    model.warmup(imgsz=(1, 3, *imgsz))
+    summaries, ms = [], []
+    for file in files:
+        im0 = cv2.imread(str(file))
+        t = time.perf_counter()
+        im = pre([im0])
+        det = non_max_suppression(model(im), conf_thres, iou_thres, max_det=1000)[0]
+        det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+        ms.append((time.perf_counter() - t) * 1E3)
+        summaries.append(summarize(det.cpu()))
+    return summaries, ms
+
+
+def compare(ref, pred, kinds, iou_thres=0.5):
+    """Per-category frame and box recall/precision of pred against reference summaries ref."""
+    results = {}
+    for k, name in enumerate(kinds):
+        n = {'ref_frames': 0, 'pred_frames': 0, 'both_frames': 0, 'ref_boxes': 0, 'pred_boxes': 0, 'recalled': 0,
+             'precise': 0}
+        for r, p in zip(ref, pred):
+            a, b = r.det[r.cat == k, :4], p.det[p.cat == k, :4]
+            n['ref_frames'] += bool(len(a))
+            n['pred_frames'] += bool(len(b))
+            n['both_frames'] += bool(len(a) and len(b))
+            n['ref_boxes'] += len(a)
+            n['pred_boxes'] += len(b)
+            if len(a) and len(b):
+                iou = box_iou(a, b)
+                n['recalled'] += int((iou.amax(1) >= iou_thres).sum())
+                n['precise'] += int((iou.amax(0) >= iou_thres).sum())
+        results[name] = {
+            'ref_frames': n['ref_frames'],
+            'ref_boxes': n['ref_boxes'],
+            'frame_recall': round(n['both_frames'] / n['ref_frames'], 4) if n['ref_frames'] else None,
+            'frame_precision': round(n['both_frames'] / n['pred_frames'], 4) if n['pred_frames'] else None,
+            'box_recall': round(n['recalled'] / n['ref_boxes'], 4) if n['ref_boxes'] else None,
+            'box_precision': round(n['precise'] / n['pred_boxes'], 4) if n['pred_boxes'] else None}
+    return results
+
+
+def latency(ms):
+    return {'mean': round(float(np.mean(ms)), 2), 'p50': round(float(np.percentile(ms, 50)), 2),
+            'p95': round(float(np.percentile(ms, 95)), 2)}
+
+
+def run(
+        weights=ROOT / 'best.pt',  # PyTorch model path
+        imgsz=(416, 416),  # inference size (height, width)
+        include=('onnx', 'openvino'),  # export formats
+        int8=False,  # INT8 quantization, calibrated on calib frames
+        calib='',  # directory of site frames for INT8 calibration
+        calib_frames=300,  # max calibration frames
+        dynamic=False,  # dynamic batch axis, for --max-batch > 1 in server.py / crimefinder.py
+        val='',  # directory of site frames for the comparison, '' to skip it
+        val_frames=0,  # max comparison frames, 0 for all
+        conf_thres=0.25,  # NMS confidence threshold, rule thresholds apply on top
+        iou_thres=0.45,  # NMS IoU threshold
+        match_iou=0.5,  # IoU for a detection to match its reference
+        min_recall=0.98,  # minimum frame recall per category for a model to pass
+        rules=ROOT / 'data/rules.yaml',  # alert rules YAML/JSON, categories to compare
+        out=ROOT / 'runs/export/report.json',  # report path
+):
+    import export  # YOLOv5 export.py
+
+    device = select_device('cpu')  # edge nodes have no GPU
+    ref = DetectMultiBackend(weights, device=device)
+    imgsz = check_img_size(imgsz, s=ref.stride)
+    assert not int8 or calib, '--int8 needs --calib frames'
+
+    # Export
+    data = calib_yaml(calib, ref.names, Path(out).parent) if int8 else ROOT / 'data/coco128.yaml'
+    files = export.run(weights=weights, imgsz=imgsz, include=include, int8=int8, data=data, dynamic=dynamic,
+                       simplify=True, device='cpu')
+    exported = {}  # name -> file
+    for f in files:
+        if f.endswith('.onnx'):
+            exported['onnx'] = f
+            if int8:
+                exported['onnx-int8'] = str(quantize_onnx(f, calib, imgsz, calib_frames))
+        elif f.rstrip('/').endswith('_openvino_model'):
+            exported['openvino-int8' if int8 else 'openvino'] = f
+    report = {'weights': str(weights), 'imgsz': imgsz, 'int8': int8}
+    report['models'] = {k: {'file': v} for k, v in exported.items()}
+
+    # Compare against the PyTorch reference
+    if val:
+        ruleset = load_rules(rules)
+        summarize = ruleset.summarizer(nc=len(ref.names))
+        kinds = [r.name for r in ruleset.rules]
+        frames = images(val, val_frames)
+        LOGGER.info(f'Comparing {len(exported)} exported models with {weights} on {len(frames)} frames from {val}...')
+        ref_summaries, ref_ms = predict(ref, frames, imgsz, conf_thres, iou_thres, summarize)
+        report.update(frames=len(frames), reference={'latency_ms': latency(ref_ms)})
+        for name, f in exported.items():
+            model = DetectMultiBackend(f, device=device)
+            summaries, ms = predict(model, frames, imgsz, conf_thres, iou_thres, summarize)
+            categories = compare(ref_summaries, summaries, kinds, match_iou)
+            passed = all(c['frame_recall'] is None or c['frame_recall'] >= min_recall for c in categories.values())
+            report['models'][name].update(latency_ms=latency(ms), speedup=round(np.mean(ref_ms) / np.mean(ms), 2),
+                                          categories=categories, passed=passed)
+            recall = ', '.join(f"{k} {c['frame_recall']}" for k, c in categories.items())
+            LOGGER.info(f"{name}: {latency(ms)['mean']}ms ({report['models'][name]['speedup']}x), frame recall "
+                        f"{recall}, {'PASS' if passed else 'FAIL'}")
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2))
+    LOGGER.info(f'Report saved to {out}')
+    return report
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', type=str, default=ROOT / 'best.pt', help='PyTorch model path')
+    parser.add_argument('--imgsz', '--img', '--img-size', nargs='+', type=int, default=[416], help='image (h, w)')
+    parser.add_argument('--include', nargs='+', default=['onnx', 'openvino'], help='onnx, openvino')
+    parser.add_argument('--int8', action='store_true', help='INT8 quantization calibrated on --calib frames')
+    parser.add_argument('--calib', type=str, default='', help='directory of site frames for INT8 calibration')
+    parser.add_argument('--calib-frames', type=int, default=300, help='max calibration frames')
+    parser.add_argument('--dynamic', action='store_true', help='dynamic batch axis, for --max-batch > 1')
+    parser.add_argument('--val', type=str, default='', help='directory of site frames for the comparison')
+    parser.add_argument('--val-frames', type=int, default=0, help='max comparison frames, 0 for all')
+    parser.add_argument('--conf-thres', type=float, default=0.25, help='NMS confidence threshold')
+    parser.add_argument('--iou-thres', type=float, default=0.45, help='NMS IoU threshold')
+    parser.add_argument('--match-iou', type=float, default=0.5, help='IoU for a detection to match its reference')
+    parser.add_argument('--min-recall', type=float, default=0.98, help='minimum frame recall per category to pass')
+    parser.add_argument('--rules', type=str, default=ROOT / 'data/rules.yaml', help='alert rules YAML/JSON path')
+    parser.add_argument('--out', type=str, default=ROOT / 'runs/export/report.json', help='report path')
+    opt = parser.parse_args()
+    opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
+    print_args(vars(opt))
+    return opt
+
+
+def main(opt):
+    run(**vars(opt))
+
+
+if __name__ == '__main__':
+    opt = parse_opt()
+    main(opt)
@@ -0,0 +1,113 @@
+"""
+Per-camera incident logic: turns detections into snapshot uploads and RTDB counter updates.
+
+Usage:
+    handler = IncidentHandler(rtdb, uploader, encoder, load_rules('data/rules.yaml').rules)
+    handler(im0, summarize(det))  # postprocess.Summary of one frame
+    handler = IncidentHandler(rtdb, uploader, encoder, rules, annotate=SnapshotAnnotator(model.names))  # boxed
+    handler = IncidentHandler(rtdb, uploader, encoder, rules, clips=clips)  # + mp4, clips.add(im0) on every frame
+
+    incidents = IncidentPipeline(bucket, db, rules, journal='runs/journal.db')  # journal, rtdb, uploader, encoder
+    handler = incidents.handler(camera=0, clips=ClipRecorder(incidents.uploader))
+    incidents.close()  # after the frame sources and clips have stopped
+"""
+
+import datetime
+import time
+from collections import deque
+
+from journal import EventJournal
+from metrics import INCIDENTS, QUEUE, STAGE
+from rtdb import RTDBWriter
+from snapshot import SnapshotEncoder
+from temporal import IoUTracker
+from uploader import IncidentUploader
+from utils.general import LOGGER
+
+
+class IncidentHandler:
+    # Rule-driven alerts from thresholded frame summaries. Each rule is confirmed over K-of-N frames, per tracked
+    # object when the rule sets track, and then limited by its per-camera cooldown
+    def __init__(self, rtdb, uploader, encoder, rules, camera=0, annotate=None, clips=None):
+        self.rtdb, self.uploader, self.encoder = rtdb, uploader, encoder
+        self.annotate = annotate  # optional (im0, det) -> boxed copy, applied to alert snapshots only
+        self.clips = clips  # optional clip.ClipRecorder fed by the frame source, uploads a '<name>_clip' mp4 per alert
+        self.camera = str(camera)  # metrics label
+        self.rules = rules  # rules.Rule list, in summary.conf order
+        self.last = [time.time()] * len(rules)  # last alert time per rule
+        self.hits = [deque(maxlen=r.window) for r in rules]  # frames above threshold per rule, untracked rules
+        self.trackers = [IoUTracker(r.min_frames, r.window) if r.track else None for r in rules]
+
+    def alert(self, rule, im0, t0=None, det=None):
+        """Count a rule alert and queue im0, captured at time t0, for upload to the rule's storage prefix."""
+        n = self.rtdb.increment(rule.name)
+        LOGGER.info(f'{rule.name.capitalize()} detect : {n} count')
+        formatted_datetime = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
+        frame_name = f'{rule.name}_{formatted_datetime}_{n}.jpg'
+        if self.clips:
+            self.clips.trigger(rule.name, f'{rule.name}_{formatted_datetime}_{n}.mp4', f'{rule.name}_clip', t0)
+        INCIDENTS.inc(self.camera, rule.name)
+        with STAGE.time(self.camera, 'encode'):
+            data = self.encoder(self.annotate(im0, det) if self.annotate and det is not None else im0)
+        self.uploader.submit(rule.name, frame_name, data, rule.prefix, camera=self.camera, t0=t0)
+
+    def __call__(self, im0, summary, t0=None):
+        current_time = time.time()
+        for k, (rule, conf) in enumerate(zip(self.rules, summary.conf.values())):  # one value per rule, thresholded
+            tracker = self.trackers[k]
+            if tracker:  # new confirmed tracks only, a persisting object never re-alerts
+                confirmed = tracker.update(summary.det[summary.cat == k, :4] if conf > 0 else None)
+            else:
+                self.hits[k].append(conf > 0)
+                confirmed = conf > 0 and sum(self.hits[k]) >= rule.min_frames  # only alert on a frame that shows it
+            if confirmed and current_time - self.last[k] >= rule.cooldown:
+                self.last[k] = current_time  # Update the last detection time
+                self.alert(rule, im0, t0, summary.det[summary.cat == k] if self.annotate else None)
+                for track in confirmed if tracker else ():
+                    track.alerted = True
+
+
+class IncidentPipeline:
+    # Startup wiring shared by detect.py, server.py and crimefinder.py: local journal -> coalescing RTDB writer with
+    # counters restored from the journal -> retrying uploader, plus the snapshot encoder
+    def __init__(
+            self,
+            bucket,  # firebase_admin storage bucket
+            db,  # firebase_admin.db module (or FakeDB)
+            rules,  # rules.Rule list
+            journal='',  # local incident journal (SQLite) path, '' to disable
+            journal_max_mb=512.0,  # cap on journaled payloads awaiting upload, oldest dropped beyond it; 0 for none
+            upload_workers=2,  # incident upload threads
+            upload_queue=16,  # max pending incident uploads, oldest dropped when full
+            upload_retries=3,  # upload retries with exponential backoff
+            snapshot_quality=90,  # incident snapshot JPEG quality
+            snapshot_max_size=0,  # downscale incident snapshots to this longest side, 0 to keep frame size
+            snapshot_dir='',  # also keep incident snapshots on local disk
+            db_interval=1.0,  # seconds between coalesced RTDB updates
+            db_batch=32,  # flush RTDB early once this many paths are pending
+    ):
+        self.rules = rules
+        self.journal = EventJournal(journal, int(journal_max_mb * 2 ** 20)) if journal else None  # survives outages
+        self.rtdb = RTDBWriter(db, interval=db_interval, max_pending=db_batch,
+                               on_flush=self.journal.indexed if self.journal else None)
+        counts = self.journal.counts() if self.journal else {}  # counters resume where they left off
+        for r in rules:
+            self.rtdb.set_count(r.name, counts.get(r.name, 0))
+        self.rtdb.flush()
+        self.uploader = IncidentUploader(bucket, self.rtdb, workers=upload_workers, maxsize=upload_queue,
+                                         retries=upload_retries, save_dir=snapshot_dir, journal=self.journal)
+        self.encoder = SnapshotEncoder(quality=snapshot_quality, max_size=snapshot_max_size)
+        QUEUE.set_function(lambda: {('upload',): self.uploader.queue.qsize(), ('rtdb',): len(self.rtdb.pending)})
+
+    def handler(self, camera=0, annotate=None, clips=None):
+        """Return an IncidentHandler for camera that writes to this pipeline."""
+        return IncidentHandler(self.rtdb, self.uploader, self.encoder, self.rules, camera, annotate, clips)
+
+    def close(self):
+        """Drain uploads and RTDB writes and close the journal. Close frame sources and clip recorders first."""
+        self.uploader.close()
+        self.rtdb.close()
+        LOGGER.info(f'Incident uploads: {self.uploader.metrics()}, RTDB writes: {self.rtdb.metrics()}')
+        if self.journal:
+            LOGGER.info(f'Incident journal {self.journal.file}: {self.journal.stats()}')
+            self.journal.close()
@@ -0,0 +1,116 @@
+"""
+Offline stand-ins for the firebase_admin storage bucket and realtime database, for testing and benchmarking.
+
+Usage:
+    from fake_firebase import FakeBucket, FakeDB
+    bucket, db = FakeBucket(latency=0.05), FakeDB(latency=0.02)
+    uploader = IncidentUploader(bucket, RTDBWriter(db))
+"""
+
+import threading
+import time
+
+
+class FakeBlob:
+    # Mirrors the subset of google.cloud.storage.Blob used by detect.py
+    def __init__(self, bucket, name):
+        self.bucket, self.name = bucket, name
+
+    def upload_from_string(self, data, content_type='application/octet-stream'):
+        self.bucket._call()
+        with self.bucket.lock:
+            self.bucket.files[self.name] = (bytes(data), content_type)
+
+    def upload_from_file(self, file_obj, content_type='application/octet-stream'):
+        self.upload_from_string(file_obj.read(), content_type=content_type)
+
+
+class FakeBucket:
+    # In-memory storage bucket with configurable per-call latency and injected failures
+    def __init__(self, latency=0.0, fail=0):
+        self.latency = latency  # seconds slept per upload
+        self.fail = fail  # number of upcoming uploads that raise ConnectionError
+        self.files, self.calls = {}, 0
+        self.lock = threading.Lock()
+
+    def _call(self):
+        with self.lock:
+            self.calls += 1
+            fail = self.fail > 0
+            self.fail -= fail
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError('FakeBucket injected failure')
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+
+class FakeReference:
+    # Mirrors the subset of firebase_admin.db.Reference used by detect.py
+    def __init__(self, db, path):
+        self.db, self.path = db, path.strip('/')
+
+    def child(self, path):
+        return FakeReference(self.db, f'{self.path}/{path}')
+
+    def get(self):
+        with self.db.lock:
+            return self.db._node(self.path)
+
+    def set(self, value):
+        self.db._call()
+        with self.db.lock:
+            self.db._assign(self.path, value)
+
+    def update(self, value):
+        self.db._call()
+        with self.db.lock:
+            for k, v in value.items():  # keys may be multi-location paths, i.e. 'fire_img/-Nx1'
+                self.db._assign(f'{self.path}/{k}', v)
+
+    def push(self, value=''):
+        self.db._call()
+        with self.db.lock:
+            self.db.pushes += 1
+            ref = self.child(f'-fake{self.db.pushes:08d}')
+            self.db._assign(ref.path, value)
+        return ref
+
+
+class FakeDB:
+    # In-memory realtime database exposing the firebase_admin.db module interface (db.reference(path))
+    def __init__(self, latency=0.0, fail=0):
+        self.latency = latency  # seconds slept per round-trip
+        self.fail = fail  # number of upcoming round-trips that raise ConnectionError
+        self.data, self.calls, self.pushes = {}, 0, 0
+        self.lock = threading.RLock()
+
+    def _call(self):
+        with self.lock:
+            self.calls += 1
+            fail = self.fail > 0
+            self.fail -= fail
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ConnectionError('FakeDB injected failure')
+
+    def _node(self, path):
+        node = self.data
+        for k in filter(None, path.split('/')):
+            if not isinstance(node, dict) or k not in node:
+                return None
+            node = node[k]
+        return node
+
+    def _assign(self, path, value):
+        *parents, key = [k for k in path.split('/') if k]
+        node = self.data
+        for k in parents:
+            node = node.setdefault(k, {})
+        node[key] = value
+
+    def reference(self, path='/'):
+        return FakeReference(self, path)
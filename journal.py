@@ -0,0 +1,121 @@
+"""
+Crash-safe local incident journal: every snapshot and clip is appended to SQLite (WAL) before it is uploaded, so
+incidents survive Firebase outages and restarts, and alert counters resume where they left off.
+
+Usage:
+    journal = EventJournal('runs/journal.db', max_bytes=512 * 2 ** 20)  # payloads of the oldest unsent events dropped
+    rtdb = RTDBWriter(db, on_flush=journal.indexed)  # marks events indexed once their RTDB write lands
+    uploader = IncidentUploader(bucket, rtdb, journal=journal)  # journals on submit, re-drains the backlog
+    for kind, n in journal.counts().items():
+        rtdb.set_count(kind, n)
+"""
+
+import sqlite3
+import threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    t REAL NOT NULL,              -- capture or submit time
+    kind TEXT NOT NULL,           -- rule name
+    name TEXT NOT NULL,           -- storage file name
+    prefix TEXT NOT NULL,         -- storage folder and RTDB index path
+    camera TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    key TEXT NOT NULL,            -- RTDB push key, fixed so a replayed index write is idempotent
+    data BLOB,                    -- encoded snapshot or clip, cleared once uploaded or dropped by the size cap
+    uploaded INTEGER NOT NULL DEFAULT 0,
+    indexed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS events_pending ON events (indexed, uploaded);
+CREATE INDEX IF NOT EXISTS events_key ON events (key);
+"""
+
+
+class EventJournal:
+    # Append-only incident log in one SQLite file. Rows move from pending to uploaded to indexed; their payload is
+    # dropped once uploaded, the metadata is kept as the incident history. During a long outage, payloads beyond
+    # max_bytes are dropped oldest first: those incidents are still counted but never uploaded. SQLite reuses the freed
+    # pages, the file itself does not shrink
+    def __init__(self, file='runs/journal.db', max_bytes=0):
+        self.file = Path(file)
+        self.max_bytes = max_bytes  # cap on stored payload bytes, 0 for no limit
+        self.file.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.file), check_same_thread=False, isolation_level=None)  # autocommit
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')  # WAL: durable across process crashes, fast commits
+        self.conn.executescript(SCHEMA)
+
+    def append(self, job):
+        """Record an upload job (uploader.submit dict with key) and return its row id."""
+        with self.lock:
+            cur = self.conn.execute(
+                'INSERT INTO events (t, kind, name, prefix, camera, content_type, key, data) VALUES (?,?,?,?,?,?,?,?)',
+                (job['t'], job['kind'], job['name'], job['prefix'], job['camera'], job['content_type'], job['key'],
+                 job['data']))
+            if self.max_bytes:
+                self._trim()
+            return cur.lastrowid
+
+    def _trim(self):
+        # Drop the oldest payloads until the stored ones fit in max_bytes, keeping the rows. Called with lock held
+        size = self.conn.execute('SELECT COALESCE(SUM(LENGTH(data)), 0) FROM events').fetchone()[0]
+        drop = []
+        if size > self.max_bytes:
+            for id, n in self.conn.execute('SELECT id, LENGTH(data) FROM events WHERE data IS NOT NULL ORDER BY id'):
+                if size <= self.max_bytes:
+                    break
+                drop.append((id,))
+                size -= n
+        if drop:
+            self.conn.executemany('UPDATE events SET data = NULL WHERE id = ?', drop)
+
+    def uploaded(self, id):
+        """Mark event id as stored in the bucket, its payload is no longer needed."""
+        with self.lock:
+            self.conn.execute('UPDATE events SET uploaded = 1, data = NULL WHERE id = ?', (id,))
+
+    def indexed(self, batch):
+        """RTDBWriter flush callback: mark the events whose '<prefix>/<key>' paths are in batch as indexed."""
+        keys = [k.rsplit('/', 1)[1] for k in batch if '/' in k]
+        if keys:
+            with self.lock:
+                self.conn.executemany('UPDATE events SET indexed = 1 WHERE key = ? AND uploaded = 1',
+                                      [(k,) for k in keys])
+
+    def pending(self, limit=16, exclude=(), keys=()):
+        """Return up to limit oldest events not yet uploaded or indexed, as uploader job dicts, skipping ids in
+        exclude, events whose RTDB push key is in keys (index write already staged) and dropped payloads."""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT id, t, kind, name, prefix, camera, content_type, key, data, uploaded FROM events '
+                'WHERE indexed = 0 AND (uploaded = 1 OR data IS NOT NULL) ORDER BY id LIMIT ?',
+                (limit + len(exclude) + len(keys),)).fetchall()
+        jobs = []
+        for id, t, kind, name, prefix, camera, content_type, key, data, uploaded in rows:
+            if id not in exclude and key not in keys:
+                jobs.append({'id': id, 't': t, 'kind': kind, 'name': name, 'prefix': prefix, 'camera': camera,
+                             'content_type': content_type, 'key': key, 'data': data, 'stage': 2 if uploaded else 0})
+        return jobs[:limit]
+
+    def counts(self):
+        """Return the number of alerts per kind (one snapshot is journaled per alert), to restore RTDB counters."""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT kind, COUNT(*) FROM events WHERE content_type LIKE 'image/%' GROUP BY kind").fetchall()
+        return dict(rows)
+
+    def stats(self):
+        """Return event totals by sync state. dropped events lost their payload to max_bytes before being uploaded."""
+        with self.lock:
+            total, uploaded, indexed, dropped = self.conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(uploaded), 0), COALESCE(SUM(indexed), 0), '
+                'COALESCE(SUM(uploaded = 0 AND data IS NULL), 0) FROM events').fetchone()
+        return {'events': total, 'pending_upload': total - uploaded - dropped,
+                'pending_index': total - indexed - dropped, 'dropped': dropped}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,147 @@
+"""
+Live pipeline metrics in the Prometheus text exposition format, served at /metrics by the FastAPI app in detect.py.
+
+Usage:
+    from metrics import METRICS, STAGE
+    STAGE.observe(0.012, '0', 'inference')  # seconds, camera, stage
+    with STAGE.time('0', 'encode'):
+        ...
+    METRICS.render()  # text/plain; version=0.0.4
+"""
+
+import contextlib
+import threading
+import time
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # seconds
+
+
+def _quote(v):
+    return '"' + str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+
+
+def _labels(names, values, extra=''):
+    s = ','.join(f'{k}={_quote(v)}' for k, v in zip(names, values))
+    return f'{{{s}{"," if s and extra else ""}{extra}}}' if s or extra else ''
+
+
+class Metric:
+    # Labelled series of one metric family, safe to update from any thread
+    type = 'untyped'
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labels = name, help, tuple(labels)
+        self.series, self.fn, self.lock = {}, None, threading.Lock()
+
+    def set_function(self, fn):
+        """Sample values at render time from fn() -> {label values tuple: value}."""
+        self.fn = fn
+        return self
+
+    def samples(self):
+        with self.lock:
+            series = dict(self.series)
+        if self.fn:
+            series.update({tuple(str(x) for x in k): v for k, v in self.fn().items()})
+        return [f'{self.name}{_labels(self.labels, k)} {v:g}' for k, v in sorted(series.items())]
+
+    def render(self):
+        return '\n'.join([f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.type}', *self.samples()])
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def inc(self, *labels, value=1):
+        k = tuple(str(x) for x in labels)
+        with self.lock:
+            self.series[k] = self.series.get(k, 0) + value
+
+
+class Gauge(Metric):
+    type = 'gauge'
+
+    def set(self, value, *labels):
+        with self.lock:
+            self.series[tuple(str(x) for x in labels)] = value
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = buckets
+
+    def observe(self, value, *labels):
+        k = tuple(str(x) for x in labels)
+        with self.lock:
+            s = self.series.get(k)
+            if s is None:
+                s = self.series[k] = [0] * (len(self.buckets) + 2)  # per-bucket counts, sum, count
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    s[i] += 1
+                    break
+            s[-2] += value
+            s[-1] += 1
+
+    @contextlib.contextmanager
+    def time(self, *labels):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t, *labels)
+
+    def samples(self):
+        with self.lock:
+            series = {k: list(v) for k, v in self.series.items()}
+        lines = []
+        for k, s in sorted(series.items()):
+            n = 0
+            for b, c in zip(self.buckets, s):
+                n += c  # cumulative
+                lines.append(f'{self.name}_bucket{_labels(self.labels, k, "le=%s" % _quote(f"{b:g}"))} {n}')
+            lines.append(f'{self.name}_bucket{_labels(self.labels, k, "le=%s" % _quote("+Inf"))} {s[-1]}')
+            lines.append(f'{self.name}_sum{_labels(self.labels, k)} {s[-2]:g}')
+            lines.append(f'{self.name}_count{_labels(self.labels, k)} {s[-1]}')
+        return lines
+
+
+class Registry:
+    # Collection of metric families rendered together
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        return self.metrics.setdefault(metric.name, metric)
+
+    def render(self):
+        return '\n'.join(m.render() for m in self.metrics.values()) + '\n'
+
+
+METRICS = Registry()
+STAGE = METRICS.register(Histogram('crimefinder_stage_seconds', 'Per-stage latency: decode, motion, preprocess, '
+                                   'inference, nms, postprocess, encode, clip, upload, db', ('camera', 'stage')))
+FRAMES = METRICS.register(Counter('crimefinder_frames_total', 'Frames processed', ('camera',)))
+FPS = METRICS.register(Gauge('crimefinder_fps', 'Frames processed per second', ('camera',)))
+INCIDENTS = METRICS.register(Counter('crimefinder_incidents_total', 'Alerts raised', ('camera', 'rule')))
+QUEUE = METRICS.register(Gauge('crimefinder_queue_depth', 'Pending items per queue', ('queue',)))
+SKIPPED = METRICS.register(Counter('crimefinder_frames_skipped_total', 'Frames skipped by the motion gate',
+                                   ('camera',)))
+
+
+class FPSMeter:
+    # Per-camera processed-frame counter and smoothed fps gauge
+    def __init__(self, camera, alpha=0.1):
+        self.camera, self.alpha = str(camera), alpha
+        self.t, self.fps = None, 0.0
+
+    def tick(self):
+        t = time.perf_counter()
+        if self.t is not None and t > self.t:
+            self.fps = (1 - self.alpha) * self.fps + self.alpha / (t - self.t) if self.fps else 1 / (t - self.t)
+            FPS.set(self.fps, self.camera)
+        self.t = t
+        FRAMES.inc(self.camera)
@@ -0,0 +1,95 @@
+"""
+Motion-gated inference: a cheap per-camera check that decides whether a frame is worth running the model on.
+
+Usage:
+    gate = MotionGate(threshold=0.01, keyframe=2.0, camera=0)
+    if gate(im0):  # motion, recent motion or keyframe due
+        pred = model(im)
+    gate.stats()  # {'checked': ..., 'skipped': ..., 'motion': ..., 'keyframes': ..., 'score': ...}
+
+    want = gate.check(im0)  # score only, when the batch may run anyway for another camera
+    gate.record(ran=want or batch_runs)  # skip counters and keyframe timer follow what actually happened
+"""
+
+import time
+
+import numpy as np
+
+from metrics import SKIPPED
+from utils.general import cv2
+
+
+class MotionGate:
+    # Scores each frame as the fraction of pixels that differ from a running-average background, on a small grayscale
+    # copy. The model runs on motion, for hold seconds after it, and on a keyframe at least every keyframe seconds
+    def __init__(self, threshold=0.01, keyframe=2.0, hold=1.0, size=64, pixel_thres=25, alpha=0.05, camera=0):
+        self.threshold = threshold  # fraction of changed pixels that counts as motion
+        self.keyframe = keyframe  # max seconds between inferences, so slow-growing fires are still seen; 0 to disable
+        self.hold = hold  # seconds to keep inferring after motion, lets K-of-N rules confirm a stopped object
+        self.size = size  # width of the downscaled copy
+        self.pixel_thres = pixel_thres  # grayscale difference of a changed pixel
+        self.alpha = alpha  # background learning rate
+        self.camera = str(camera)  # metrics label
+        self.shape = self.small = self.gray = self.bg = self.ref = self.diff = None  # reallocated on resolution change
+        self.last_run = self.last_motion = -float('inf')
+        self.reason, self.t = None, None  # last check(): 'motion', 'hold', 'keyframe' or None, and its time
+        self.checked = self.skipped = self.motion = self.keyframes = 0
+        self.score = 0.0
+
+    def _buffers(self, shape):
+        self.shape, (h, w) = shape, shape[:2]
+        size = (self.size, max(round(h * self.size / w), 1))  # cv2 (width, height)
+        self.small = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.gray = np.empty(size[::-1], dtype=np.uint8)
+        self.ref = np.empty(size[::-1], dtype=np.uint8)  # uint8 copy of the background
+        self.diff = np.empty(size[::-1], dtype=np.uint8)
+        self.bg = None
+
+    def __call__(self, im0, t=None):
+        """Return True if the model should run on BGR frame im0, captured at time t, and record the outcome."""
+        run = self.check(im0, t)
+        self.record(run)
+        return run
+
+    def check(self, im0, t=None):
+        """Return True if the model should run on BGR frame im0, captured at time t. Follow with record()."""
+        t = time.time() if t is None else t
+        if im0.shape != self.shape:
+            self._buffers(im0.shape)
+        cv2.resize(im0, self.small.shape[1::-1], dst=self.small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self.small, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        self.checked += 1
+        if self.bg is None:  # first frame: no background yet, always infer
+            self.bg = self.gray.astype(np.float32)
+            self.score, moved = 1.0, True
+        else:
+            cv2.convertScaleAbs(self.bg, dst=self.ref)
+            cv2.absdiff(self.gray, self.ref, dst=self.diff)
+            self.score = np.count_nonzero(self.diff > self.pixel_thres) / self.diff.size
+            cv2.accumulateWeighted(self.gray, self.bg, self.alpha)
+            moved = self.score >= self.threshold
+        if moved:
+            self.motion += 1
+            self.last_motion = t
+            self.reason = 'motion'
+        elif t - self.last_motion < self.hold:
+            self.reason = 'hold'
+        elif self.keyframe and t - self.last_run >= self.keyframe:
+            self.reason = 'keyframe'
+        else:
+            self.reason = None
+        self.t = t
+        return self.reason is not None
+
+    def record(self, ran):
+        """Record whether the model ran on the last checked frame, also when it ran for another camera's motion."""
+        if ran:
+            self.keyframes += self.reason == 'keyframe'
+            self.last_run = self.t
+        else:
+            self.skipped += 1
+            SKIPPED.inc(self.camera)
+
+    def stats(self):
+        return {'checked': self.checked, 'skipped': self.skipped, 'motion': self.motion, 'keyframes': self.keyframes,
+                'score': round(self.score, 4)}
@@ -0,0 +1,210 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""
+Benchmark the CrimeFinder frame pipeline (preprocess, inference, NMS, rules, snapshot encode, upload, RTDB) on
+synthetic or recorded frames, with Firebase replaced by in-memory fakes of configurable latency.
+
+Usage:
+    $ python pipeline_benchmark.py                                        # stub model, synthetic frames
+    $ python pipeline_benchmark.py --weights best.pt --source clip.mp4    # real model, recorded video
+    $ python pipeline_benchmark.py --cameras 1 4 8 --batch-size 1 4 8 --imgsz 416 640 --out runs/bench.json
+
+Reports frames/sec, p50/p95/p99 alert latency (frame capture to snapshot uploaded) and memory per camera for every
+cameras x batch-size x imgsz combination, as JSON.
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.common import DetectMultiBackend
+from utils.general import LOGGER, cv2, print_args
+from utils.torch_utils import select_device
+
+from events import IncidentHandler
+from fake_firebase import FakeBucket, FakeDB
+from metrics import STAGE
+from rtdb import RTDBWriter
+from rules import load_rules, parse_rules
+from server import InferenceServer
+from snapshot import SnapshotEncoder
+from uploader import IncidentUploader
+
+
+class StubModel:
+    # DetectMultiBackend stand-in: fixed latency, low-confidence noise boxes and an occasional alert-class box
+    def __init__(self, nc=9, latency_ms=20.0, per_image_ms=5.0, alert_rate=0.05, alert_class=0, device='cpu'):
+        self.stride, self.names, self.nc = 32, {i: f'class{i}' for i in range(nc)}, nc
+        self.device = torch.device(device)
+        self.pt, self.jit, self.triton, self.fp16 = True, False, False, False
+        self.latency_ms, self.per_image_ms = latency_ms, per_image_ms
+        self.alert_rate, self.alert_class = alert_rate, alert_class
+
+    def warmup(self, imgsz=(1, 3, 640, 640)):
+        pass
+
+    def __call__(self, im, augment=False, visualize=False):
+        b, _, h, w = im.shape
+        time.sleep((self.latency_ms + self.per_image_ms * b) / 1E3)
+        pred = torch.rand(b, 100, 5 + self.nc, device=self.device)
+        pred[..., :4] *= torch.tensor([w, h, 64, 64], device=self.device)  # xywh
+        pred[..., 4] *= 0.2  # objectness x class conf stays below conf_thres
+        alert = torch.rand(b, device=self.device) < self.alert_rate
+        pred[alert, 0, 4:] = 0
+        pred[alert, 0, 4] = pred[alert, 0, 5 + self.alert_class] = 0.95
+        return pred
+
+
+class SyntheticCamera:
+    # Frames from a video file (looped) or, for source 'synthetic', a noise background with a moving rectangle
+    def __init__(self, source='synthetic', shape=(480, 640), seed=0):
+        self.cap = None if source == 'synthetic' else cv2.VideoCapture(source)
+        rng = np.random.default_rng(seed)
+        self.bg = rng.integers(0, 255, (*shape, 3), dtype=np.uint8)
+        self.i = seed * 17
+
+    def read(self):
+        if self.cap:
+            ok, im = self.cap.read()
+            if not ok:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ok, im = self.cap.read()
+            return im
+        h, w = self.bg.shape[:2]
+        self.i += 1
+        x, y = self.i * 7 % (w - 80), self.i * 3 % (h - 80)
+        im = self.bg.copy()
+        im[y:y + 80, x:x + 80] = (0, 0, 255)
+        return im
+
+
+def rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        return float('nan')
+
+
+def bench(model, ruleset, source, cameras, batch, imgsz, frames, frame_size, upload_ms, db_ms):
+    """Run frames per camera through the pipeline and return throughput, alert latency and memory statistics."""
+    STAGE.series.clear()
+    rss = rss_mb()
+    rtdb = RTDBWriter(FakeDB(latency=db_ms / 1E3))
+    uploader = IncidentUploader(FakeBucket(latency=upload_ms / 1E3), rtdb, maxsize=1024, history=10 ** 6)
+    encoder = SnapshotEncoder()
+    server = InferenceServer(imgsz=(imgsz, imgsz), max_batch=batch, ruleset=ruleset, model=model)
+    handlers = [IncidentHandler(rtdb, uploader, encoder, ruleset.rules, camera=i) for i in range(cameras)]
+    cams = [SyntheticCamera(source, frame_size, seed=i) for i in range(cameras)]
+
+    t = time.time()
+    for _ in range(frames):
+        captured = [(i, c.read(), time.time()) for i, c in enumerate(cams)]
+        for j in range(0, cameras, batch):
+            b = captured[j:j + batch]
+            for (i, im0, t0), det in zip(b, server.infer([x[1] for x in b], [x[0] for x in b])):
+                with STAGE.time(i, 'postprocess'):
+                    handlers[i](im0, server.summarize(det), t0)
+    dt = time.time() - t
+    uploader.close(timeout=60)
+    rtdb.close()
+
+    lat = np.array(uploader.latency) * 1E3
+    pct = {f'p{q}': round(float(np.percentile(lat, q)), 2) if len(lat) else None for q in (50, 95, 99)}
+    stages = {}
+    for (_, stage), s in STAGE.series.items():
+        n, total = stages.get(stage, (0, 0.0))
+        stages[stage] = (n + s[-1], total + s[-2])
+    return {
+        'cameras': cameras,
+        'batch_size': batch,
+        'imgsz': imgsz,
+        'fps': round(frames * cameras / dt, 2),
+        'alerts': int(len(lat)),
+        'alert_latency_ms': pct,
+        'memory_mb_per_camera': round((rss_mb() - rss) / cameras, 2),
+        'stage_ms': {k: round(total / n * 1E3, 3) for k, (n, total) in stages.items() if n},
+        'uploads': uploader.metrics(),
+        'rtdb': rtdb.metrics()}
+
+
+def run(
+        weights='',  # model path, '' for the stub model
+        source='synthetic',  # 'synthetic' or a video file
+        rules='',  # alert rules YAML/JSON, '' for a single fire rule without cooldown
+        cameras=(1, 4),  # camera counts
+        batch_size=(1, 4),  # max batch sizes
+        imgsz=(416, 640),  # inference sizes
+        frames=200,  # frames per camera
+        frame_size=(480, 640),  # synthetic frame height, width
+        upload_ms=150.0,  # fake storage upload latency
+        db_ms=80.0,  # fake RTDB round-trip latency
+        model_ms=20.0,  # stub model latency per batch
+        per_image_ms=5.0,  # stub model latency per image
+        alert_rate=0.05,  # stub model probability of an alert box per image
+        device='',  # cuda device, i.e. 0 or 0,1,2,3 or cpu
+        out=ROOT / 'runs/benchmark/pipeline.json',  # JSON results path
+):
+    device = select_device(device)
+    if weights:
+        model = DetectMultiBackend(weights, device=device)
+    else:
+        model = StubModel(latency_ms=model_ms, per_image_ms=per_image_ms, alert_rate=alert_rate, device=device)
+    ruleset = load_rules(rules) if rules else parse_rules({'rules': [{'name': 'fire', 'classes': [0], 'cooldown': 0}]})
+
+    results = []
+    for n in cameras:
+        for b in batch_size:
+            if b > n:
+                continue  # a batch never holds more than one frame per camera
+            for s in imgsz:
+                r = bench(model, ruleset, source, n, b, s, frames, frame_size, upload_ms, db_ms)
+                LOGGER.info(f"cameras={n} batch={b} imgsz={s}: {r['fps']} FPS, alert latency {r['alert_latency_ms']}")
+                results.append(r)
+
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    report = {'weights': str(weights) or 'stub', 'source': str(source), 'results': results}
+    out.write_text(json.dumps(report, indent=2))
+    LOGGER.info(f'Results saved to {out}')
+    return report
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', type=str, default='', help="model path, '' for the stub model")
+    parser.add_argument('--source', type=str, default='synthetic', help="'synthetic' or a video file")
+    parser.add_argument('--rules', type=str, default='', help="alert rules YAML/JSON, '' for a single fire rule")
+    parser.add_argument('--cameras', nargs='+', type=int, default=[1, 4], help='camera counts')
+    parser.add_argument('--batch-size', nargs='+', type=int, default=[1, 4], help='max batch sizes')
+    parser.add_argument('--imgsz', '--img', '--img-size', nargs='+', type=int, default=[416, 640], help='image sizes')
+    parser.add_argument('--frames', type=int, default=200, help='frames per camera')
+    parser.add_argument('--frame-size', nargs=2, type=int, default=[480, 640], help='synthetic frame height width')
+    parser.add_argument('--upload-ms', type=float, default=150.0, help='fake storage upload latency')
+    parser.add_argument('--db-ms', type=float, default=80.0, help='fake RTDB round-trip latency')
+    parser.add_argument('--model-ms', type=float, default=20.0, help='stub model latency per batch')
+    parser.add_argument('--per-image-ms', type=float, default=5.0, help='stub model latency per image')
+    parser.add_argument('--alert-rate', type=float, default=0.05, help='stub model alert probability per image')
+    parser.add_argument('--device', default='', help='cuda device, i.e. 0 or 0,1,2,3 or cpu')
+    parser.add_argument('--out', type=str, default=ROOT / 'runs/benchmark/pipeline.json', help='JSON results path')
+    opt = parser.parse_args()
+    print_args(vars(opt))
+    return opt
+
+
+def main(opt):
+    run(**vars(opt))
+
+
+if __name__ == '__main__':
+    opt = parse_opt()
+    main(opt)
@@ -0,0 +1,42 @@
+"""
+Vectorized detection post-processing: ignored-class masking and per-category confidence thresholds in one pass.
+
+Usage:
+    summarize = DetectionSummarizer(nc=len(model.names), categories={'fire': ((0, 4), 0.5)}, ignore=(1, 2, 6))
+    summary = summarize(det)  # det: (n, 6) NMS output of one frame
+    summary.conf  # {'fire': 0.71}, max confidence above threshold per category, 0.0 if none
+"""
+
+from collections import namedtuple
+
+import torch
+
+# Kept detections, per-detection category index (-1 if none or below threshold), max confidence per category
+Summary = namedtuple('Summary', ['det', 'cat', 'conf'])
+
+
+class DetectionSummarizer:
+    # Precomputes per-class lookup tensors so a frame is summarized without any per-box Python work
+    def __init__(self, nc, categories, ignore=()):  # categories: {name: (class ids, confidence threshold)}
+        self.kinds = list(categories)
+        self.cat = torch.full((nc,), -1, dtype=torch.long)  # class -> category index
+        self.thr = torch.full((nc,), float('inf'))  # class -> alert threshold, inf for classes that never alert
+        self.keep = torch.ones(nc, dtype=torch.bool)  # class -> kept after masking
+        self.keep[list(ignore)] = False
+        for k, (classes, conf) in enumerate(categories.values()):
+            self.cat[list(classes)] = k
+            self.thr[list(classes)] = conf
+        self.arange = torch.arange(len(self.kinds))
+
+    def _to(self, device):
+        if self.cat.device != device:
+            self.cat, self.thr, self.keep, self.arange = (
+                x.to(device) for x in (self.cat, self.thr, self.keep, self.arange))
+
+    def __call__(self, det):
+        self._to(det.device)
+        det = det[self.keep[det[:, 5].long()]]  # drop ignored classes
+        cls = det[:, 5].long()
+        cat = torch.where(det[:, 4] >= self.thr[cls], self.cat[cls], torch.full_like(cls, -1))  # -1 below threshold
+        best = (det[:, 4:5] * (cat[:, None] == self.arange)).amax(0) if len(det) else self.arange * 0.0
+        return Summary(det, cat, dict(zip(self.kinds, best.tolist())))
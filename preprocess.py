@@ -0,0 +1,76 @@
+"""
+Preprocessing fast path: letterbox, BGR to RGB, HWC to CHW and 0-1 scaling of a frame batch into preallocated tensors.
+
+Usage:
+    pre = Preprocessor(imgsz=(416, 416), device=model.device, half=model.fp16, max_batch=4)
+    im = pre(im0s)  # (n, 3, 416, 416) model input, overwritten by the next call
+
+    pre = Preprocessor(imgsz=(416, 416), device=model.device, stride=model.stride, auto=model.pt)
+    im = pre([im0])  # (1, 3, 320, 416) for a 4:3 frame, minimum rectangle like LoadStreams
+"""
+
+import numpy as np
+import torch
+
+from utils.general import cv2
+
+
+class Preprocessor:
+    # Per source resolution: a letterbox canvas and resize buffer laid out once, so cameras can move between batch
+    # slots freely. One input tensor per padded size is shared by the whole batch
+    def __init__(self, imgsz=(640, 640), device='cpu', half=False, max_batch=1, color=114, max_layouts=16, stride=32,
+                 auto=False):
+        self.h, self.w = imgsz
+        self.device = torch.device(device)
+        self.color = color  # letterbox border value
+        self.stride, self.auto = stride, auto  # auto: pad same-shape batches to a stride-multiple rectangle (pt models)
+        self.layouts = {}  # (source shape, rectangular) -> (canvas, resized, top, left, new h, new w)
+        self.max_layouts = max_layouts  # oldest layout dropped beyond this many resolutions, i.e. a folder of images
+        self.max_batch, self.dtype = max_batch, torch.float16 if half else torch.float32
+        self.buffers = {}  # padded (h, w) -> (pinned host tensor, device input tensor)
+        self._buffer(self.h, self.w)
+
+    def _buffer(self, h, w):
+        # Preallocated (max_batch, 3, h, w) input, one per padded size. Rectangles only vary with the source aspect
+        if (h, w) not in self.buffers:
+            cuda = self.device.type == 'cuda'
+            host = torch.empty((self.max_batch, 3, h, w), dtype=self.dtype, pin_memory=cuda)
+            self.buffers[h, w] = host, torch.empty_like(host, device=self.device) if cuda else host
+        return self.buffers[h, w]
+
+    def _layout(self, shape, rect=False):
+        # Same geometry as utils.augmentations.letterbox(auto=rect, scaleup=True), so scale_boxes() maps back exactly
+        r = min(self.h / shape[0], self.w / shape[1])
+        nw, nh = int(round(shape[1] * r)), int(round(shape[0] * r))
+        h, w = self.h, self.w
+        if rect:  # minimum rectangle
+            h, w = nh + (self.h - nh) % self.stride, nw + (self.w - nw) % self.stride
+        top, left = int(round((h - nh) / 2 - 0.1)), int(round((w - nw) / 2 - 0.1))
+        if len(self.layouts) >= self.max_layouts:
+            self.layouts.pop(next(iter(self.layouts)))
+        canvas = np.full((h, w, 3), self.color, dtype=np.uint8)
+        self.layouts[shape, rect] = canvas, np.empty((nh, nw, 3), dtype=np.uint8), top, left, nh, nw
+        return self.layouts[shape, rect]
+
+    def __call__(self, im0s):
+        """Return the (n, 3, h, w) model input for BGR frames im0s, written into the preallocated buffers. h, w is
+        imgsz, or the minimum stride-multiple rectangle with auto=True when all frames have the same shape."""
+        n, rect = len(im0s), self.auto and len({x.shape for x in im0s}) == 1  # as LoadStreams
+        host = None
+        for i, im0 in enumerate(im0s):
+            # Same-size frames share a canvas, each one is copied into the input tensor before the next is drawn
+            key = im0.shape, rect
+            canvas, resized, top, left, nh, nw = self.layouts.get(key) or self._layout(*key)
+            if host is None:
+                host, out = self._buffer(*canvas.shape[:2])
+            if (nh, nw) == im0.shape[:2]:
+                canvas[top:top + nh, left:left + nw] = im0
+            else:
+                cv2.resize(im0, (nw, nh), dst=resized, interpolation=cv2.INTER_LINEAR)
+                canvas[top:top + nh, left:left + nw] = resized
+            src = torch.from_numpy(canvas)  # shares memory, no copy
+            for c in range(3):  # BGR to RGB, HWC to CHW and uint8 to 0.0-1.0 in a single pass per channel
+                torch.div(src[..., 2 - c], 255, out=host[i, c])
+        if out is not host:
+            out[:n].copy_(host[:n], non_blocking=True)
+        return out[:n]
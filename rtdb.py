@@ -0,0 +1,123 @@
+"""
+Write-coalescing Firebase Realtime Database client for incident counters and image indexes.
+
+Usage:
+    rtdb = RTDBWriter(db, interval=1.0, max_pending=32)
+    n = rtdb.increment('fire')  # in-memory counter
+    rtdb.index('fire', 'fire_20240101_120000_1.jpg')  # image index + count, sent with the next multi-path update
+    rtdb = RTDBWriter(db, on_flush=journal.indexed)  # on_flush(batch) after every successful update
+    rtdb.close()
+"""
+
+import random
+import threading
+import time
+
+from metrics import STAGE
+from utils.general import LOGGER
+
+PUSH_CHARS = '-0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ_abcdefghijklmnopqrstuvwxyz'  # Firebase push ID alphabet
+
+
+def push_id():
+    # Client-side equivalent of db.reference().push().key: 8 timestamp chars + 12 random chars, sorts by time
+    t, ts = int(time.time() * 1000), ''
+    for _ in range(8):
+        ts, t = PUSH_CHARS[t % 64] + ts, t // 64
+    return ts + ''.join(random.choices(PUSH_CHARS, k=12))
+
+
+class RTDBWriter:
+    # Gathers counter updates and image-index pushes into a single root update() per flush
+    def __init__(self, db, interval=1.0, max_pending=32, on_flush=None):
+        self.ref = db.reference()  # one reference reused for every write
+        self.on_flush = on_flush  # optional callback with each batch of paths once written
+        self.interval = interval  # seconds between flushes
+        self.max_pending = max_pending  # flush early once this many paths are pending
+        self.counts, self.pending = {}, {}
+        self.sending = {}  # batch of the update in progress
+        self.lock, self.flush_lock = threading.Lock(), threading.Lock()
+        self.wake, self.stopped = threading.Event(), False
+        self.writes = self.entries = self.errors = 0
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def increment(self, kind):
+        """Increment the in-memory counter for kind and return its new value."""
+        with self.lock:
+            self.counts[kind] = n = self.counts.get(kind, 0) + 1
+            return n
+
+    def set_count(self, kind, n):
+        """Set the counter for kind and stage '<kind>_count' for the next flush."""
+        with self.lock:
+            self.counts[kind] = n
+        self._stage({f'{kind}_count': f'{n}'})
+
+    def index(self, kind, name, prefix=None, key=None):
+        """Stage a push of {'file_name': name} to prefix (default '<kind>_img') with the current '<kind>_count'. A
+        given push key makes the write idempotent when it is replayed."""
+        prefix = prefix or f'{kind}_img'
+        with self.lock:
+            n = self.counts.get(kind, 0)
+        self._stage({f'{prefix}/{key or push_id()}': {'file_name': name}, f'{kind}_count': f'{n}'})
+
+    def _stage(self, values):
+        with self.lock:
+            self.pending.update(values)
+            if len(self.pending) >= self.max_pending:
+                self.wake.set()
+
+    def _run(self):
+        while not self.stopped:
+            self.wake.wait(self.interval)
+            self.wake.clear()
+            self.flush()
+
+    def flush(self):
+        """Send all pending paths in one multi-path update, keeping them pending if the write fails."""
+        with self.flush_lock:
+            with self.lock:
+                batch, self.pending = self.pending, {}
+                self.sending = batch
+            if not batch:
+                return True
+            try:
+                with STAGE.time('all', 'db'):
+                    self.ref.update(batch)
+            except Exception as e:
+                with self.lock:
+                    self.errors += 1
+                    batch.update(self.pending)  # values staged meanwhile are newer
+                    self.pending, self.sending = batch, {}
+                LOGGER.warning(f'WARNING ⚠️ RTDB update of {len(batch)} paths failed, will retry: {e}')
+                return False
+            with self.lock:
+                self.writes += 1
+                self.entries += len(batch)
+            if self.on_flush:
+                try:
+                    self.on_flush(batch)
+                except Exception as e:
+                    LOGGER.warning(f'WARNING ⚠️ RTDB flush callback failed: {e}')
+            with self.lock:
+                self.sending = {}
+            return True
+
+    def staged(self):
+        """Return the push keys of index writes pending or being sent."""
+        with self.lock:
+            paths = [*self.pending, *self.sending]
+        return {p.rsplit('/', 1)[1] for p in paths if '/' in p}
+
+    def metrics(self):
+        """Return round-trips, coalesced paths, failed writes and paths still pending."""
+        with self.lock:
+            return {'writes': self.writes, 'entries': self.entries, 'errors': self.errors, 'pending': len(self.pending)}
+
+    def close(self):
+        """Stop the flush thread and send whatever is still pending."""
+        self.stopped = True
+        self.wake.set()
+        self.thread.join()
+        self.flush()
@@ -0,0 +1,69 @@
+"""
+Data-driven alert rules mapping model classes to alert categories, loaded from YAML or JSON (see data/rules.yaml).
+
+Usage:
+    ruleset = load_rules('data/rules.yaml')
+    summarize = ruleset.summarizer(nc=len(model.names))  # class-id lookup tensors, O(1) per detection
+    handler = IncidentHandler(rtdb, uploader, encoder, ruleset.rules)  # per camera
+"""
+
+from collections import namedtuple
+from pathlib import Path
+
+import yaml
+
+from postprocess import DetectionSummarizer
+from utils.general import LOGGER
+
+Rule = namedtuple('Rule', ['name', 'classes', 'conf', 'cooldown', 'min_frames', 'window', 'track', 'prefix'])
+RULE_DEFAULTS = {'conf': 0.5, 'cooldown': 10, 'min_frames': 1, 'window': None, 'track': False}
+
+DEFAULT_RULES = {  # original single-frame, 10 s cooldown rules, used when no rules file is found
+    'ignore': [1, 2, 6],
+    'rules': [
+        {'name': 'violence', 'classes': [7], 'conf': 0.55},
+        {'name': 'weapon', 'classes': [5, 8]},
+        {'name': 'fire', 'classes': [0, 4]}]}
+
+
+class RuleSet:
+    # Validated rules plus the classes ignored entirely
+    def __init__(self, rules, ignore=()):
+        self.rules, self.ignore = rules, tuple(ignore)
+
+    def summarizer(self, nc):
+        """Compile the rules into a DetectionSummarizer for a model with nc classes."""
+        for r in self.rules:
+            if any(not 0 <= c < nc for c in r.classes):
+                raise ValueError(f"rule '{r.name}' classes {r.classes} out of range for a {nc}-class model")
+        return DetectionSummarizer(nc, {r.name: (r.classes, r.conf) for r in self.rules}, self.ignore)
+
+
+def parse_rules(d):
+    """Build a RuleSet from a dict with 'rules' (list of rule dicts) and optional 'ignore' class ids."""
+    rules, seen = [], set()
+    for x in d.get('rules') or []:
+        unknown = set(x) - set(Rule._fields)
+        if unknown or 'name' not in x or 'classes' not in x:
+            raise ValueError(f'invalid rule {x}, expected keys {Rule._fields} with name and classes required')
+        r = Rule(**{**RULE_DEFAULTS, 'prefix': f"{x['name']}_img", **x})
+        r = r._replace(classes=tuple(int(c) for c in r.classes), window=r.window or r.min_frames)
+        if not 1 <= r.min_frames <= r.window:
+            raise ValueError(f"rule '{r.name}' needs 1 <= min_frames <= window, got {r.min_frames} and {r.window}")
+        if seen & set(r.classes):
+            raise ValueError(f"rule '{r.name}' classes {r.classes} already belong to another rule")
+        seen |= set(r.classes)
+        rules.append(r)
+    if not rules:
+        raise ValueError('no alert rules defined')
+    return RuleSet(rules, d.get('ignore') or ())
+
+
+def load_rules(file=None):
+    """Load alert rules from a YAML/JSON file, falling back to the built-in defaults if it does not exist."""
+    if file is None or not Path(file).is_file():
+        if file is not None:
+            LOGGER.warning(f'WARNING ⚠️ rules file {file} not found, using built-in rules')
+        return parse_rules(DEFAULT_RULES)
+    with open(file, errors='ignore') as f:
+        return parse_rules(yaml.safe_load(f) or {})  # JSON is a subset of YAML
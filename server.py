@@ -0,0 +1,338 @@
+# YOLOv5 🚀 by Ultralytics, AGPL-3.0 license
+"""
+Long-lived multi-camera inference server: one DetectMultiBackend shared by N camera streams with dynamic batching.
+
+Usage:
+    $ python server.py --weights best.pt --img 416 --conf-thres 0.5 --source http://10.50.9.134:8090/?action=stream
+
+    ruleset = load_rules('data/rules.yaml')
+    server = InferenceServer('best.pt', imgsz=(416, 416), max_batch=8, max_wait_ms=20, ruleset=ruleset)
+    handler = IncidentPipeline(bucket, db, ruleset.rules).handler(camera=0)
+    cam = server.add_camera('http://10.50.9.134:8090/?action=stream', handler)
+    # handler(im0, summary, t0) is called on the server thread with each frame's postprocess.Summary and capture time
+    server.start()
+    server.health()  # serving thread, model and per-camera frame age
+    server.reload('best.pt')  # load new weights in the background, swapped in between batches
+"""
+
+import argparse
+import sys
+import threading
+import time
+from pathlib import Path
+
+FILE = Path(__file__).resolve()
+ROOT = FILE.parents[0]  # YOLOv5 root directory
+if str(ROOT) not in sys.path:
+    sys.path.append(str(ROOT))  # add ROOT to PATH
+
+from models.common import DetectMultiBackend
+from utils.general import LOGGER, Profile, check_img_size, non_max_suppression, print_args, scale_boxes
+from utils.torch_utils import select_device, smart_inference_mode
+
+from metrics import STAGE, FPSMeter
+from preprocess import Preprocessor
+from rules import load_rules
+from streams import LatestFrameReader
+
+
+def static_batch(model):
+    """Return the fixed batch size of a loaded DetectMultiBackend, None if it takes any batch size (PyTorch,
+    TorchScript and --dynamic exports)."""
+    if model.pt or model.jit or getattr(model, 'dynamic', False):  # dynamic: TensorRT engine with a dynamic axis
+        return None
+    session = getattr(model, 'session', None)  # ONNX Runtime
+    if session is not None:
+        b = session.get_inputs()[0].shape[0]
+        return b if isinstance(b, int) else None  # symbolic axis name when dynamic
+    ov = getattr(model, 'ov_compiled_model', None) or getattr(model, 'executable_network', None)  # OpenVINO
+    if ov is not None:
+        b = ov.inputs[0].get_partial_shape()[0]
+        return None if b.is_dynamic else b.get_length()
+    return 1  # other exports are built with export.py's default static batch of 1
+
+
+class InferenceServer:
+    # Loads the model once, reads every camera on its own thread and batches the newest frames across cameras
+    def __init__(
+            self,
+            weights='best.pt',  # model path or triton URL
+            device='',  # cuda device, i.e. 0 or 0,1,2,3 or cpu
+            imgsz=(640, 640),  # inference size (height, width)
+            conf_thres=0.25,  # confidence threshold
+            iou_thres=0.45,  # NMS IOU threshold
+            max_det=1000,  # maximum detections per image
+            classes=None,  # filter by class
+            agnostic_nms=False,  # class-agnostic NMS
+            half=False,  # use FP16 half-precision inference
+            dnn=False,  # use OpenCV DNN for ONNX inference
+            data=None,  # dataset.yaml path
+            max_batch=8,  # maximum frames per forward pass
+            max_wait_ms=20,  # maximum time to wait for a batch to fill after its first frame
+            ruleset=None,  # rules.RuleSet used to summarize detections, default built-in rules
+            model=None,  # already loaded DetectMultiBackend (or stand-in), skips loading weights
+    ):
+        self.device = select_device(device)
+        self.weights, self.load = str(weights), dict(dnn=dnn, data=data, fp16=half)  # reload() arguments
+        self.model = model or DetectMultiBackend(weights, device=self.device, **self.load)
+        self.imgsz = check_img_size(imgsz, s=self.model.stride)
+        self.nms = dict(conf_thres=conf_thres, iou_thres=iou_thres, classes=classes, agnostic=agnostic_nms,
+                        max_det=max_det)
+        fixed = static_batch(self.model)
+        if fixed and max_batch > fixed:
+            LOGGER.warning(f'WARNING ⚠️ {weights} has a static batch size of {fixed}, using max_batch={fixed}. '
+                           f'Export with --dynamic for max_batch={max_batch}')
+            max_batch = fixed
+        self.max_batch, self.max_wait = max_batch, max_wait_ms / 1E3
+        self.ruleset = ruleset or load_rules()
+        self.summarize = self.ruleset.summarizer(nc=len(self.model.names))
+        self.pre = Preprocessor(self.imgsz, self.model.device, self.model.fp16, max_batch, stride=self.model.stride,
+                                auto=self.model.pt)
+        self.model.warmup(imgsz=(1 if self.model.pt or self.model.triton else max_batch, 3, *self.imgsz))
+        self.ready = threading.Event()  # set by readers whenever any camera decodes a frame
+        self.cameras, self.lock, self.rr = {}, threading.Lock(), 0  # rr: round-robin start for batch fairness
+        self.running, self.thread = False, None
+        self.pending, self.reloading, self.reloads = None, None, 0  # staged (weights, model, pre, summarize) swap
+        self.last_batch = time.time()  # last successful forward pass
+
+    def add_camera(self, source, handler, fps=0, gate=None, clips=None):
+        """Start reading source at up to fps frames/s (0 for all fresh frames); handler(im0, summary, t0) receives its
+        summarized detections and capture time. Frames rejected by gate(im0, t), i.e. a motion.MotionGate, skip the
+        model. clips, i.e. the handler's clip.ClipRecorder, is fed every frame read, gated or not. Returns the camera
+        id."""
+        with self.lock:
+            cam = max(self.cameras, default=-1) + 1
+            reader = LatestFrameReader(source, fps=fps, notify=self.ready, name=cam)
+            self.cameras[cam] = {'source': str(source), 'handler': handler, 'reader': reader, 'fps': FPSMeter(cam),
+                                 'gate': gate, 'clips': clips}
+        LOGGER.info(f'Camera {cam} added: {source}')
+        return cam
+
+    def remove_camera(self, cam):
+        """Stop reading camera cam."""
+        with self.lock:
+            c = self.cameras.pop(cam)
+        c['reader'].close()
+
+    def restart_camera(self, cam):
+        """Reopen camera cam's stream. The model and the camera's handler state are kept."""
+        with self.lock:
+            c = self.cameras[cam]
+        c['reader'].restart()
+
+    def stats(self):
+        """Return decoded/dropped/processed/reconnect counters and last frame age per camera."""
+        with self.lock:
+            return {cam: c['reader'].stats() for cam, c in self.cameras.items()}
+
+    def health(self, stale=10.0):
+        """Return a health report. healthy needs a live serving thread and a frame from every camera within stale
+        seconds."""
+        with self.lock:
+            cameras = {cam: {'source': c['source'], **c['reader'].stats(), **(c['gate'].stats() if c['gate'] else {})}
+                       for cam, c in self.cameras.items()}
+        alive = bool(self.thread and self.thread.is_alive()) and time.time() - self.last_batch < stale
+        return {
+            'healthy': alive and all(c['decoded'] and c['age'] < stale for c in cameras.values()),
+            'serving': alive,
+            'weights': self.weights,
+            'reloads': self.reloads,
+            'reloading': bool(self.reloading and self.reloading.is_alive()),
+            'cameras': cameras}
+
+    def _load(self, weights):
+        # Build and warm up a replacement model off the serving thread, then stage it for the next batch
+        try:
+            model = DetectMultiBackend(weights, device=self.device, **self.load)
+            if check_img_size(self.imgsz, s=model.stride) != list(self.imgsz):
+                raise ValueError(f'imgsz {self.imgsz} is not a multiple of the new model stride {model.stride}')
+            fixed = static_batch(model)
+            if fixed and self.max_batch > fixed:
+                raise ValueError(f'static batch size {fixed} is below max_batch={self.max_batch}, use --dynamic')
+            summarize = self.ruleset.summarizer(nc=len(model.names))
+            pre = Preprocessor(self.imgsz, model.device, model.fp16, self.max_batch, stride=model.stride, auto=model.pt)
+            model.warmup(imgsz=(1 if model.pt or model.triton else self.max_batch, 3, *self.imgsz))
+        except Exception as e:
+            LOGGER.warning(f'WARNING ⚠️ Reloading {weights} failed, keeping {self.weights}: {e}')
+            return
+        self.pending = str(weights), model, pre, summarize
+
+    def reload(self, weights):
+        """Load weights on a background thread and swap them in between batches, without pausing the cameras.
+        Returns the loading thread."""
+        if self.reloading and self.reloading.is_alive():
+            LOGGER.warning(f'WARNING ⚠️ Reload of {weights} skipped, another reload is in progress')
+            return self.reloading
+        self.reloading = threading.Thread(target=self._load, args=(weights,), daemon=True)
+        self.reloading.start()
+        return self.reloading
+
+    def _swap(self):
+        # Apply a staged reload; only called from the thread running infer(), so a batch never mixes models
+        pending, self.pending = self.pending, None
+        if pending:
+            self.weights, self.model, self.pre, self.summarize = pending
+            self.reloads += 1
+            LOGGER.info(f'Model reloaded from {self.weights}')
+
+    def _batch(self):
+        # (cam, im0, capture time) of each due camera, returned at max_batch frames or max_wait after the first one
+        batch, taken, gated, deadline = [], set(), set(), None
+        while self.running:
+            self.ready.clear()
+            with self.lock:
+                cams = list(self.cameras.items())
+            self.rr = (self.rr + 1) % max(len(cams), 1)
+            for cam, c in cams[self.rr:] + cams[:self.rr]:
+                if len(batch) >= self.max_batch:
+                    break
+                f = None if cam in taken else c['reader'].read(timeout=0)
+                if f is not None and c['clips']:
+                    c['clips'].add(*f)  # static frames belong in incident clips too
+                if f is not None and c['gate']:
+                    with STAGE.time(cam, 'motion'):
+                        if not c['gate'](*f):
+                            gated.add(cam)  # static frame, the camera may still join with its next frame
+                            continue
+                if f is not None:
+                    batch.append((cam, *f))
+                    taken.add(cam)
+            now = time.time()
+            if batch and deadline is None:
+                deadline = now + self.max_wait
+            if batch and (len(batch) >= self.max_batch or len(taken | gated) == len(cams) or now >= deadline):
+                return batch
+            self.ready.wait(deadline - now if deadline else 0.05)  # 0.05 s cap lets fps-limited cameras fall due
+        return []  # stopping, a partial batch is dropped
+
+    @smart_inference_mode()
+    def infer(self, im0s, cams=()):
+        """Run one batched forward pass over BGR frames, returning per-frame (n, 6) detections in frame coordinates.
+        Stage latencies are recorded for every camera in cams."""
+        self._swap()
+        dt = (Profile(), Profile(), Profile())
+        with dt[0]:
+            im = self.pre(im0s)  # letterboxed, RGB, BCHW, 0.0 - 1.0 in preallocated buffers
+        with dt[1]:
+            pred = self.model(im)
+        with dt[2]:
+            pred = non_max_suppression(pred, **self.nms)
+            for det, im0 in zip(pred, im0s):
+                det[:, :4] = scale_boxes(im.shape[2:], det[:, :4], im0.shape).round()
+        for cam in cams:
+            for x, stage in zip(dt, ('preprocess', 'inference', 'nms')):
+                STAGE.observe(x.dt, cam, stage)
+        return pred
+
+    def serve(self):
+        """Batch, infer and dispatch detections until stop() is called."""
+        while self.running:
+            batch = self._batch()
+            if not batch:
+                continue
+            cams, im0s, ts = zip(*batch)
+            try:
+                pred = self.infer(im0s, cams)
+            except Exception as e:  # keep serving, persistent failures make health() report not serving
+                LOGGER.warning(f'WARNING ⚠️ Inference error on cameras {cams}: {e}')
+                continue
+            self.last_batch = time.time()
+            for cam, im0, t0, det in zip(cams, im0s, ts, pred):
+                c = self.cameras.get(cam)  # camera may have been removed meanwhile
+                try:
+                    if c:
+                        with STAGE.time(cam, 'postprocess'):
+                            c['handler'](im0, self.summarize(det), t0)
+                        c['fps'].tick()
+                except Exception as e:  # one camera's handler must not take the others down
+                    LOGGER.warning(f'WARNING ⚠️ Camera {cam} handler error: {e}')
+
+    def start(self):
+        self.running, self.last_batch = True, time.time()
+        self.thread = threading.Thread(target=self.serve, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=10.0):
+        """Stop serving and wait for the batch in flight to reach its handlers, so clips and uploads can be closed
+        after this returns."""
+        self.running = False
+        self.ready.set()  # wake _batch()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                LOGGER.warning(f'WARNING ⚠️ Serving thread still busy after {timeout}s')
+        for cam in list(self.cameras):
+            self.remove_camera(cam)
+
+
+def parse_opt():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--weights', type=str, default=ROOT / 'best.pt', help='model path or triton URL')
+    parser.add_argument('--source', nargs='+', type=str, required=True, help='camera stream URLs or webcam ids')
+    parser.add_argument('--data', type=str, default=None, help='(optional) dataset.yaml path')
+    parser.add_argument('--imgsz', '--img', '--img-size', nargs='+', type=int, default=[640], help='inference size h,w')
+    parser.add_argument('--conf-thres', type=float, default=0.25, help='confidence threshold')
+    parser.add_argument('--iou-thres', type=float, default=0.45, help='NMS IoU threshold')
+    parser.add_argument('--max-det', type=int, default=1000, help='maximum detections per image')
+    parser.add_argument('--device', default='', help='cuda device, i.e. 0 or 0,1,2,3 or cpu')
+    parser.add_argument('--half', action='store_true', help='use FP16 half-precision inference')
+    parser.add_argument('--dnn', action='store_true', help='use OpenCV DNN for ONNX inference')
+    parser.add_argument('--max-batch', type=int, default=8, help='maximum frames per forward pass')
+    parser.add_argument('--max-wait-ms', type=float, default=20, help='maximum batch fill time after first frame')
+    parser.add_argument('--rules', type=str, default=ROOT / 'data/rules.yaml', help='alert rules YAML/JSON path')
+    parser.add_argument('--metrics-port', type=int, default=0, help='serve Prometheus /metrics on this port, 0 off')
+    parser.add_argument('--stream-fps', type=float, default=0, help='max frames/s processed per camera, 0 for all')
+    parser.add_argument('--motion-thres', type=float, default=0, help='changed-pixel fraction to run the model, 0 off')
+    parser.add_argument('--noclip', action='store_true', help='do not record incident clips')
+    parser.add_argument('--plain-snapshots', action='store_true', help='do not draw alert boxes on incident snapshots')
+    parser.add_argument('--journal', type=str, default=ROOT / 'runs/journal.db', help="incident journal, '' to disable")
+    parser.add_argument('--journal-max-mb', type=float, default=512,
+                        help='disk cap on unsent snapshots/clips, oldest dropped (counted, never uploaded), 0 off')
+    parser.add_argument('--motion-keyframe', type=float, default=2.0, help='max seconds between inferences when static')
+    opt = parser.parse_args()
+    opt.imgsz *= 2 if len(opt.imgsz) == 1 else 1  # expand
+    print_args(vars(opt))
+    return opt
+
+
+def main(opt):
+    from detect import bucket, db, serve_metrics  # initializes firebase_admin once for every camera
+    from clip import ClipRecorder
+    from events import IncidentPipeline
+    from motion import MotionGate
+    from snapshot import SnapshotAnnotator
+
+    sources, fps, ruleset, port = opt.source, opt.stream_fps, load_rules(opt.rules), opt.metrics_port
+    motion, keyframe, noclip, journal = opt.motion_thres, opt.motion_keyframe, opt.noclip, opt.journal
+    journal_max_mb, plain = opt.journal_max_mb, opt.plain_snapshots
+    del opt.source, opt.stream_fps, opt.rules, opt.metrics_port, opt.motion_thres, opt.motion_keyframe, opt.noclip
+    del opt.journal, opt.journal_max_mb, opt.plain_snapshots
+    if port:
+        serve_metrics(port)
+    incidents, server, clips = IncidentPipeline(bucket, db, ruleset.rules, journal, journal_max_mb), None, []
+    try:
+        server = InferenceServer(**vars(opt), ruleset=ruleset)
+        clips = [None if noclip else ClipRecorder(incidents.uploader, camera=i) for i in range(len(sources))]
+        annotate = None if plain else SnapshotAnnotator(server.model.names)  # alert boxes on snapshots only
+        for i, s in enumerate(sources):  # camera ids are assigned 0, 1, 2, ... in order
+            gate = MotionGate(motion, keyframe, camera=i) if motion else None
+            handler = incidents.handler(camera=i, annotate=annotate, clips=clips[i])
+            server.add_camera(s, handler, fps=fps, gate=gate, clips=clips[i])
+        server.start()
+        server.thread.join()
+    except KeyboardInterrupt:
+        pass
+    finally:  # queued uploads and RTDB writes are drained on any exit
+        if server:
+            LOGGER.info(f'Frame counters: {server.stats()}')
+            server.stop()
+        for c in clips:
+            if c:
+                c.close()
+        incidents.close()
+
+
+if __name__ == '__main__':
+    opt = parse_opt()
+    main(opt)
@@ -0,0 +1,51 @@
+"""
+In-memory JPEG encoding of incident snapshots.
+
+Usage:
+    encoder = SnapshotEncoder(quality=85, max_size=960)
+    jpeg_bytes = encoder(im0)
+    jpeg_bytes = encoder(SnapshotAnnotator(model.names)(im0, det))  # with the alert's boxes drawn
+"""
+
+import cv2
+import numpy as np
+from ultralytics.utils.plotting import Annotator, colors
+
+
+class SnapshotEncoder:
+    # Encode BGR frames to JPEG bytes with optional downscaling into a reused resize buffer
+    def __init__(self, quality=90, max_size=0):
+        self.params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self.max_size = max_size  # longest side in pixels, 0 to keep the original resolution
+        self.buffer = None  # downscaled frame, reused while the camera resolution is unchanged
+
+    def resize(self, im):
+        h, w = im.shape[:2]
+        if not self.max_size or max(h, w) <= self.max_size:
+            return im
+        r = self.max_size / max(h, w)
+        shape = (round(h * r), round(w * r), *im.shape[2:])
+        if self.buffer is None or self.buffer.shape != shape:
+            self.buffer = np.empty(shape, dtype=im.dtype)
+        return cv2.resize(im, (shape[1], shape[0]), dst=self.buffer, interpolation=cv2.INTER_AREA)
+
+    def __call__(self, im):
+        ok, buf = cv2.imencode('.jpg', self.resize(im), self.params)
+        if not ok:
+            raise ValueError(f'JPEG encoding failed for frame of shape {im.shape}')
+        return buf.tobytes()
+
+
+class SnapshotAnnotator:
+    # Draw detection boxes on a copy of an incident frame, so only alerting frames pay for annotation
+    def __init__(self, names, line_width=3, hide_labels=False, hide_conf=False):
+        self.names, self.line_width = names, line_width
+        self.hide_labels, self.hide_conf = hide_labels, hide_conf
+
+    def __call__(self, im, det):
+        annotator = Annotator(im.copy(), line_width=self.line_width, example=str(self.names))
+        for *xyxy, conf, cls in det.tolist():
+            c = int(cls)
+            label = None if self.hide_labels else (self.names[c] if self.hide_conf else f'{self.names[c]} {conf:.2f}')
+            annotator.box_label(xyxy, label, color=colors(c, True))
+        return annotator.result()
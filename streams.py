@@ -0,0 +1,167 @@
+"""
+Latest-frame-wins stream ingestion: one capture thread per source keeps only the newest decoded frame.
+
+Usage:
+    reader = LatestFrameReader('http://10.50.9.134:8090/?action=stream', fps=5)
+    im0, t = reader.read()  # newest frame, at most 5 per second
+    reader.stats()  # {'decoded': ..., 'dropped': ..., 'processed': ..., 'reconnects': ..., 'age': ...}
+    reader.restart()  # reopen the capture on a new thread, i.e. after a read stalled
+
+    dataset = LoadLatestStreams(source, img_size=640, stride=32, fps=5)  # drop-in for LoadStreams in detect.py
+    dataset = LoadLatestStreams(source, fps=5, timeout=0.5)  # a stalled camera repeats its last frame after 0.5 s
+    dataset.fresh  # per source, False when its frame is a repeat and should not be inferred again
+    dataset = LoadLatestStreams(source, fps=5, raw=True)  # yields im=None, for preprocess.Preprocessor
+"""
+
+import os
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+from metrics import STAGE
+from utils.augmentations import letterbox
+from utils.general import LOGGER, clean_str, cv2
+
+
+class LatestFrameReader:
+    # Decodes a stream on a daemon thread, overwriting the unread frame so consumers never see a stale one
+    def __init__(self, source, fps=0, notify=None, name=None):
+        self.source = str(source)
+        self.name = self.source if name is None else str(name)  # camera label for metrics
+        self.fps = fps  # target frames processed per second, 0 for every fresh frame
+        self.notify = notify  # optional threading.Event set whenever a new frame arrives
+        self.frame, self.t = None, 0.0  # newest frame and its capture time
+        self.seq = self.read_seq = 0  # frame sequence numbers, decoded and last read
+        self.last = 0.0  # time of the last read
+        self.decoded = self.dropped = self.processed = self.reconnects = 0
+        self.cond = threading.Condition()
+        self.gen = 0  # capture generation, restart() abandons a thread stuck in cap.read() for a new one
+        self.opened = time.time()  # last (re)start, a stream without a first frame ages from here
+        self.running = True
+        self.thread = self._start()
+
+    def _start(self):
+        thread = threading.Thread(target=self._update, args=(self.gen,), daemon=True)
+        thread.start()
+        return thread
+
+    def _open(self):
+        s = self.source
+        return cv2.VideoCapture(int(s) if s.isnumeric() else s)
+
+    def _update(self, gen):
+        cap = self._open()
+        while self.running and gen == self.gen:
+            t = time.perf_counter()
+            success, im = cap.read()  # blocks for as long as the backend allows when the stream stalls
+            if gen != self.gen or not self.running:
+                break  # restarted or closed meanwhile, a newer thread owns the stream
+            if not success:
+                LOGGER.warning(f'WARNING ⚠️ Video stream unresponsive, reopening {self.source}')
+                time.sleep(1)
+                cap.release()
+                cap = self._open()
+                self.reconnects += 1
+                continue
+            STAGE.observe(time.perf_counter() - t, self.name, 'decode')
+            with self.cond:
+                if gen != self.gen:
+                    break
+                self.dropped += self.seq > self.read_seq  # previous frame was never read
+                self.frame, self.t = im, time.time()
+                self.seq += 1
+                self.decoded += 1
+                self.cond.notify_all()
+            if self.notify:
+                self.notify.set()
+        cap.release()
+
+    def read(self, timeout=None):
+        """Return (frame, capture time) of the newest unread frame once the target fps allows it, None on timeout."""
+        deadline = None if timeout is None else time.time() + timeout
+        with self.cond:
+            while True:
+                now = time.time()
+                fresh = self.seq > self.read_seq
+                hold = self.last + 1 / self.fps - now if self.fps else 0  # seconds until the next frame is due
+                if fresh and hold <= 0:
+                    break
+                wait = hold if fresh else None
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self.cond.wait(wait)
+            self.read_seq, self.last = self.seq, now
+            self.processed += 1
+            return self.frame, self.t
+
+    def restart(self):
+        """Reopen the stream on a new capture thread, e.g. after a stall. The old thread may be blocked in cap.read()
+        and exits once that returns. The last frame stays readable."""
+        LOGGER.info(f'Restarting stream {self.source}')
+        with self.cond:
+            self.gen += 1
+            self.opened = time.time()
+            self.reconnects += 1
+        self.thread = self._start()
+
+    def age(self):
+        """Seconds since the last decoded frame, or since the stream was (re)started before its first one."""
+        return time.time() - (self.t if self.seq else self.opened)
+
+    def stats(self):
+        with self.cond:
+            return {'decoded': self.decoded, 'dropped': self.dropped, 'processed': self.processed,
+                    'reconnects': self.reconnects, 'age': round(self.age(), 3)}
+
+    def close(self):
+        self.running = False
+        self.thread.join(timeout=5)
+
+
+class LoadLatestStreams:
+    # LoadStreams-compatible iterator over LatestFrameReaders, i.e. `python detect.py --source URL --latest-frame`
+    def __init__(self, sources='file.streams', img_size=640, stride=32, auto=True, fps=0, raw=False, timeout=1.0):
+        self.mode = 'stream'
+        self.img_size, self.stride, self.auto = img_size, stride, auto
+        self.raw = raw  # skip letterboxing, frames are preprocessed by the consumer
+        self.timeout = timeout  # max seconds a batch waits for slow sources, which then repeat their last frame
+        sources = Path(sources).read_text().rsplit() if os.path.isfile(sources) else [sources]
+        self.sources = [clean_str(x) for x in sources]
+        self.readers = [LatestFrameReader(s, fps=fps, name=i) for i, s in enumerate(sources)]
+        self.imgs = []  # last frame per source
+        for s, r in zip(sources, self.readers):
+            first = r.read(timeout=30)  # like LoadStreams, every source must deliver a first frame
+            assert first is not None, f'Failed to read {s}'
+            self.imgs.append(first[0])
+        self.fresh = [True] * len(self.readers)  # sources that delivered a new frame for the current batch
+        self.count = 0
+
+    def __iter__(self):
+        self.count = -1
+        return self
+
+    def __next__(self):
+        self.count += 1
+        deadline = time.time() + self.timeout
+        for i, r in enumerate(self.readers):
+            f = r.read(timeout=max(deadline - time.time(), 0))  # one stalled camera delays the batch by <= timeout
+            self.fresh[i] = f is not None
+            if f is not None:
+                self.imgs[i] = f[0]
+        im0 = list(self.imgs)  # sources without a fresh frame repeat their last one, as LoadStreams does
+        if self.raw:
+            return self.sources, None, im0, None, ''
+        auto = self.auto and len({x.shape for x in im0}) == 1  # rect inference only if all shapes equal
+        im = np.stack([letterbox(x, self.img_size, stride=self.stride, auto=auto)[0] for x in im0])
+        im = np.ascontiguousarray(im[..., ::-1].transpose((0, 3, 1, 2)))  # BGR to RGB, BHWC to BCHW
+        return self.sources, im, im0, None, ''
+
+    def __len__(self):
+        return len(self.sources)
+
+    def stats(self):
+        return {s: r.stats() for s, r in zip(self.sources, self.readers)}
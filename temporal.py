@@ -0,0 +1,60 @@
+"""
+Temporal alert confirmation: a lightweight per-camera IoU tracker with K-of-N frame confirmation per track.
+
+Usage:
+    tracker = IoUTracker(k=3, n=5)
+    for boxes in frames:  # (m, 4) xyxy tensor of one category's detections, or None when there are none
+        for track in tracker.update(boxes):  # tracks confirmed in 3 of their last 5 frames, not yet alerted
+            track.alerted = True
+"""
+
+from collections import deque
+
+import torch
+
+from utils.metrics import box_iou
+
+
+class Track:
+    # One tracked object: last box, hit history over the confirmation window and frames since last match
+    __slots__ = 'id', 'box', 'hits', 'age', 'alerted'
+
+    def __init__(self, id, box, n):
+        self.id, self.box, self.age, self.alerted = id, box, 0, False
+        self.hits = deque([True], maxlen=n)
+
+
+class IoUTracker:
+    # Greedy IoU association of one category's boxes between consecutive processed frames
+    def __init__(self, k=1, n=1, iou_thres=0.3, max_age=30):
+        self.k, self.n = k, n  # confirm a track once it is matched in k of its last n frames
+        self.iou_thres = iou_thres  # minimum IoU to continue a track
+        self.max_age = max_age  # frames a track survives unmatched, bridges detector flicker
+        self.tracks, self.next_id = [], 0
+
+    def update(self, boxes=None):
+        """Associate boxes with tracks and return confirmed tracks matched in this frame that have not alerted yet."""
+        m = 0 if boxes is None else len(boxes)
+        matched = {}  # track index -> box index
+        if m and self.tracks:
+            iou = box_iou(torch.stack([x.box for x in self.tracks]), boxes)
+            while True:  # greedy: best remaining pair first
+                v, i = iou.flatten().max(0)
+                if v < self.iou_thres:
+                    break
+                t, b = divmod(int(i), m)
+                matched[t] = b
+                iou[t, :], iou[:, b] = -1, -1
+        for t, track in enumerate(self.tracks):
+            if t in matched:
+                track.box, track.age = boxes[matched[t]], 0
+            else:
+                track.age += 1
+            track.hits.append(t in matched)
+        self.tracks = [x for x in self.tracks if x.age <= self.max_age]
+        used = set(matched.values())
+        for b in range(m):
+            if b not in used:  # unmatched boxes start new tracks
+                self.tracks.append(Track(self.next_id, boxes[b], self.n))
+                self.next_id += 1
+        return [x for x in self.tracks if not x.alerted and x.age == 0 and sum(x.hits) >= self.k]  # seen right now
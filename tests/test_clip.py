@@ -0,0 +1,48 @@
+"""ClipRecorder post-event window and timer fallback, with the mp4 writer replaced by a recorder."""
+
+import time
+
+import pytest
+
+from clip import ClipRecorder
+
+
+@pytest.fixture
+def written(monkeypatch):
+    clips = []
+    monkeypatch.setattr(ClipRecorder, '_write', lambda self, clip: clips.append(clip))
+    return clips
+
+
+def recorder(**kwargs):
+    rec = ClipRecorder(uploader=None, fps=0, **kwargs)
+    rec.encoder = lambda im: im  # frames stand in for their JPEG bytes
+    return rec
+
+
+def add(rec, frames):
+    # Feed (frame, t) pairs and wait for the encoder thread to buffer them
+    for im, t in frames:
+        rec.add(im, t)
+    deadline = time.time() + 5
+    while (t, im) not in rec.buffer and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_post_window(written):
+    rec, t0 = recorder(pre=1.0, post=1.0, grace=10.0), time.time()
+    add(rec, [('old', t0 - 1.5), ('a', t0 - 0.8), ('b', t0)])
+    rec.trigger('fire', 'fire.mp4', 'fire_clip', t0)
+    add(rec, [('c', t0 + 0.5), ('d', t0 + 1.0), ('e', t0 + 1.5)])  # d reaches the end of the clip
+    rec.close()  # waits for the clip writer
+    assert len(written) == 1 and [im for _, im in written[0]['frames']] == ['a', 'b', 'c', 'd']  # 'old' before pre
+
+
+def test_timer_expiry(written):
+    rec, t0 = recorder(pre=1.0, post=0.1, grace=0.1), time.time()
+    add(rec, [('a', t0)])
+    rec.trigger('fire', 'fire.mp4', 'fire_clip', t0)  # camera stalls, no frame past the clip's end arrives
+    time.sleep(0.5)
+    assert not rec.clips  # finished by the timer, not by close()
+    rec.close()
+    assert len(written) == 1 and [im for _, im in written[0]['frames']] == ['a']
@@ -0,0 +1,94 @@
+"""EventJournal replay through IncidentUploader and RTDBWriter, against the offline Firebase stand-ins."""
+
+import time
+
+from fake_firebase import FakeBucket, FakeDB
+from journal import EventJournal
+from rtdb import RTDBWriter
+from uploader import IncidentUploader
+
+
+def event(journal, name, key, uploaded=False):
+    # Journal an event as IncidentUploader.submit() does, optionally marked uploaded as if the process then crashed
+    id = journal.append({'t': time.time(), 'kind': 'fire', 'name': name, 'prefix': 'fire_img', 'camera': '0',
+                         'content_type': 'image/jpeg', 'key': key, 'data': b'jpg'})
+    if uploaded:
+        journal.uploaded(id)
+    return id
+
+
+def drain(journal, bucket, db, timeout=5.0):
+    # Restart: a new writer and uploader replay the backlog until every event is indexed
+    rtdb = RTDBWriter(db, interval=0.05, on_flush=journal.indexed)
+    uploader = IncidentUploader(bucket, rtdb, journal=journal, sync_interval=0.05, backoff=0.01)
+    deadline = time.time() + timeout
+    while journal.stats()['pending_index'] and time.time() < deadline:
+        time.sleep(0.02)
+    uploader.close()
+    rtdb.close()
+    return uploader
+
+
+def test_replay_is_idempotent(tmp_path):
+    journal, bucket, db = EventJournal(tmp_path / 'journal.db'), FakeBucket(), FakeDB()
+    event(journal, 'f0.jpg', 'k0', uploaded=True)  # crashed before its index write
+    event(journal, 'f1.jpg', 'k1')  # crashed before its upload
+    uploader = drain(journal, bucket, db)
+    assert journal.stats() == {'events': 2, 'pending_upload': 0, 'pending_index': 0, 'dropped': 0}
+    assert list(bucket.files) == ['fire_img/f1.jpg']  # f0 is not uploaded again
+    assert db.data['fire_img'] == {'k0': {'file_name': 'f0.jpg'}, 'k1': {'file_name': 'f1.jpg'}}
+    assert uploader.metrics()['uploaded'] == 1 and uploader.metrics()['reindexed'] == 1
+
+    db_calls = db.calls
+    drain(journal, bucket, db, timeout=0.2)  # second restart: nothing left to replay
+    assert db.calls == db_calls and bucket.calls == 1
+    journal.close()
+
+
+def test_replayed_index_write_keeps_its_key(tmp_path):
+    journal, db = EventJournal(tmp_path / 'journal.db'), FakeDB()
+    event(journal, 'f0.jpg', 'k0', uploaded=True)
+    for _ in range(2):  # the same event indexed twice, i.e. the flush landed but its callback did not
+        rtdb = RTDBWriter(db, interval=60)
+        rtdb.index('fire', 'f0.jpg', key='k0')
+        rtdb.close()
+    assert db.data['fire_img'] == {'k0': {'file_name': 'f0.jpg'}}  # one entry, not a duplicate push
+
+
+def test_no_resubmits_while_rtdb_down(tmp_path):
+    journal, bucket, db = EventJournal(tmp_path / 'journal.db'), FakeBucket(), FakeDB(fail=10 ** 6)
+    rtdb = RTDBWriter(db, interval=0.02, on_flush=journal.indexed)
+    uploader = IncidentUploader(bucket, rtdb, journal=journal, sync_interval=0.02, maxsize=4, backoff=0.01)
+    for i in range(4):
+        uploader.submit('fire', f'f{i}.jpg', b'jpg', t0=time.time())
+    time.sleep(0.5)  # many sync passes and failed flushes
+    m = uploader.metrics()
+    assert (m['uploaded'], m['resubmitted'], m['reindexed']) == (4, 0, 0)
+    assert bucket.calls == 4
+    db.fail = 0  # RTDB back: the staged index writes land without any replay
+    deadline = time.time() + 5
+    while journal.stats()['pending_index'] and time.time() < deadline:
+        time.sleep(0.02)
+    uploader.close()
+    rtdb.close()
+    assert len(db.data['fire_img']) == 4 and journal.stats()['pending_index'] == 0
+    journal.close()
+
+
+def test_counts_survive_restart(tmp_path):
+    journal = EventJournal(tmp_path / 'journal.db')
+    for i in range(3):
+        event(journal, f'f{i}.jpg', f'k{i}')
+    journal.append({'t': time.time(), 'kind': 'fire', 'name': 'f0.mp4', 'prefix': 'fire_clip', 'camera': '0',
+                    'content_type': 'video/mp4', 'key': 'c0', 'data': b'mp4'})  # clips do not count as alerts
+    journal.close()
+    assert EventJournal(tmp_path / 'journal.db').counts() == {'fire': 3}
+
+
+def test_size_cap_drops_oldest_payloads(tmp_path):
+    journal = EventJournal(tmp_path / 'journal.db', max_bytes=7)  # room for two 3-byte snapshots
+    for i in range(3):
+        event(journal, f'f{i}.jpg', f'k{i}')
+    assert [x['name'] for x in journal.pending()] == ['f1.jpg', 'f2.jpg']  # f0 can no longer be uploaded
+    assert journal.stats() == {'events': 3, 'pending_upload': 2, 'pending_index': 2, 'dropped': 1}
+    assert journal.counts() == {'fire': 3}  # but is still counted
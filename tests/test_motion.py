@@ -0,0 +1,23 @@
+"""MotionGate decisions and skip accounting."""
+
+import numpy as np
+
+from motion import MotionGate
+
+STATIC = np.zeros((48, 64, 3), dtype=np.uint8)
+
+
+def test_static_scene_skipped():
+    gate = MotionGate(keyframe=2.0, hold=0)
+    assert [gate(STATIC, t) for t in (0, 1, 2, 3)] == [True, False, True, False]  # first frame, then keyframes
+    assert gate.stats()['skipped'] == 2 and gate.keyframes == 1
+
+
+def test_record_batch_run():
+    # Another camera's motion ran the whole batch: no skip is counted and the keyframe timer restarts
+    gate = MotionGate(keyframe=2.0, hold=0)
+    gate(STATIC, 0)
+    assert not gate.check(STATIC, 1.5)
+    gate.record(True)
+    assert gate.skipped == 0 and gate.last_run == 1.5
+    assert not gate(STATIC, 3)  # keyframe due 2 s after the batch run, not after t=0
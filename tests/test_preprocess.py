@@ -0,0 +1,23 @@
+"""Preprocessor letterbox layouts."""
+
+import numpy as np
+
+from preprocess import Preprocessor
+
+
+def frame(h, w):
+    return np.zeros((h, w, 3), dtype=np.uint8)
+
+
+def test_rectangle():
+    pre = Preprocessor((416, 416), auto=True, max_batch=2)
+    im = pre([frame(480, 640)])
+    assert tuple(im.shape) == (1, 3, 320, 416)  # 312 rows padded to the next multiple of 32, as LoadStreams
+    assert im[0, :, :4].eq(114 / 255).all() and im[0, :, 4:316].eq(0).all() and im[0, :, 316:].eq(114 / 255).all()
+    assert tuple(pre([frame(480, 640)] * 2).shape) == (2, 3, 320, 416)
+
+
+def test_square():
+    assert tuple(Preprocessor((416, 416))([frame(480, 640)]).shape) == (1, 3, 416, 416)  # static exports
+    pre = Preprocessor((416, 416), auto=True, max_batch=2)
+    assert tuple(pre([frame(480, 640), frame(720, 1280)]).shape) == (2, 3, 416, 416)  # mixed shapes
@@ -0,0 +1,52 @@
+"""RTDBWriter against fake_firebase.FakeDB: coalesced multi-path updates and retention on failure."""
+
+import time
+
+from fake_firebase import FakeDB
+from rtdb import RTDBWriter
+
+
+def test_coalescing():
+    db = FakeDB()
+    rtdb = RTDBWriter(db, interval=60, max_pending=100)  # no timed flush during the test
+    for i in range(5):
+        rtdb.increment('fire')
+        rtdb.index('fire', f'f{i}.jpg', key=f'k{i}')
+    rtdb.increment('weapon')
+    rtdb.index('weapon', 'w.jpg', key='k5')
+    assert db.calls == 0
+    assert rtdb.flush()
+    assert db.calls == 1  # one round-trip for 6 index entries and 2 counters
+    assert db.data['fire_count'] == '5' and db.data['weapon_count'] == '1'
+    assert db.data['fire_img'] == {f'k{i}': {'file_name': f'f{i}.jpg'} for i in range(5)}
+    assert db.data['weapon_img'] == {'k5': {'file_name': 'w.jpg'}}
+    rtdb.close()
+    assert db.calls == 1  # nothing left to send
+
+
+def test_failed_flush_is_retried():
+    db = FakeDB(fail=1)
+    rtdb = RTDBWriter(db, interval=60)
+    rtdb.increment('fire')
+    rtdb.index('fire', 'f0.jpg', key='k0')
+    assert not rtdb.flush()
+    assert rtdb.metrics()['pending'] == 2 and db.data == {}
+    rtdb.increment('fire')
+    rtdb.index('fire', 'f1.jpg', key='k1')  # staged meanwhile, newer count wins
+    assert rtdb.flush()
+    assert db.data['fire_count'] == '2'
+    assert set(db.data['fire_img']) == {'k0', 'k1'}
+    assert rtdb.metrics()['errors'] == 1
+    rtdb.close()
+
+
+def test_early_flush():
+    db = FakeDB()
+    rtdb = RTDBWriter(db, interval=60, max_pending=4)
+    for i in range(4):
+        rtdb.index('fire', f'f{i}.jpg', key=f'k{i}')  # 4 index paths + the counter reach max_pending
+    deadline = time.time() + 2
+    while not db.calls and time.time() < deadline:  # woken early, the flush thread writes well before the interval
+        time.sleep(0.01)
+    assert len(db.data.get('fire_img', {})) == 4
+    rtdb.close()
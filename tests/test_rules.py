@@ -0,0 +1,76 @@
+"""Rule parsing and IncidentHandler K-of-N confirmation, with the offline Firebase stand-ins."""
+
+from pathlib import Path
+
+import pytest
+import torch
+
+from events import IncidentHandler
+from fake_firebase import FakeDB
+from rtdb import RTDBWriter
+from rules import load_rules, parse_rules
+
+ROOT = Path(__file__).resolve().parents[1]
+BOX = [10., 10., 50., 50.]
+
+
+class Uploads:
+    # IncidentUploader stand-in recording submitted file names
+    def __init__(self):
+        self.names = []
+
+    def submit(self, kind, name, data, prefix=None, **kwargs):
+        self.names.append(f'{prefix}/{name}')
+
+
+def frames(rule, hits):
+    # Run an IncidentHandler for one rule over frames with (True) or without (False) a class-0 detection at BOX.
+    # Returns the frame indices that alerted
+    ruleset = parse_rules({'ignore': [1], 'rules': [{'name': 'fire', 'classes': [0], 'cooldown': 0, **rule}]})
+    summarize, uploads = ruleset.summarizer(nc=2), Uploads()
+    rtdb = RTDBWriter(FakeDB(), interval=60)
+    handler = IncidentHandler(rtdb, uploads, lambda im: b'jpg', ruleset.rules)
+    alerts = []
+    for i, hit in enumerate(hits):
+        n = len(uploads.names)
+        handler(None, summarize(torch.tensor([[*BOX, 0.9, 0.]]) if hit else torch.zeros((0, 6))))
+        if len(uploads.names) > n:
+            alerts.append(i)
+    rtdb.close()
+    return alerts
+
+
+def test_parse_defaults():
+    r = parse_rules({'rules': [{'name': 'fire', 'classes': [0, 4], 'min_frames': 3}]}).rules[0]
+    assert r.window == 3 and r.prefix == 'fire_img' and r.classes == (0, 4) and not r.track
+
+
+@pytest.mark.parametrize('rule', [
+    {'name': 'fire', 'classes': [0], 'min_frames': 4, 'window': 3},  # K > N
+    {'name': 'fire', 'classes': [0], 'bogus': 1},  # unknown key
+    {'name': 'fire'}])  # no classes
+def test_parse_invalid(rule):
+    with pytest.raises(ValueError):
+        parse_rules({'rules': [rule]})
+
+
+def test_parse_overlapping_classes():
+    with pytest.raises(ValueError):
+        parse_rules({'rules': [{'name': 'fire', 'classes': [0, 4]}, {'name': 'smoke', 'classes': [4]}]})
+
+
+def test_shipped_rules():
+    ruleset = load_rules(ROOT / 'data/rules.yaml')
+    assert [r.name for r in ruleset.rules] == ['violence', 'weapon', 'fire']
+    assert all(r.track and (r.min_frames, r.window) == (3, 5) for r in ruleset.rules)
+
+
+def test_k_of_n():
+    assert frames({'min_frames': 2, 'window': 3}, [1, 0, 1]) == [2]
+    assert frames({'min_frames': 2, 'window': 3}, [1, 0, 0, 1]) == []  # empty frames age the window out
+    assert frames({'min_frames': 3}, [1, 1, 0, 1, 1, 1]) == [5]  # K consecutive by default
+
+
+def test_tracked_rule_alerts_once_per_object():
+    assert frames({'min_frames': 2, 'window': 3, 'track': True}, [1] * 10) == [1]
+    assert frames({'min_frames': 2, 'window': 3}, [1] * 4) == [1, 2, 3]  # untracked, no cooldown: every frame
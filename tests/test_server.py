@@ -0,0 +1,88 @@
+"""InferenceServer._batch dynamic batching, with a stand-in model and fake camera readers."""
+
+import time
+
+import pytest
+import torch
+
+import server
+from server import InferenceServer
+
+
+class StubModel:
+    # The DetectMultiBackend attributes InferenceServer reads; never called since the tests only batch
+    pt, jit, triton, fp16, stride, names = True, False, False, False, 32, {0: 'knife'}
+    device = torch.device('cpu')
+
+    def warmup(self, imgsz=(1, 3, 640, 640)):
+        pass
+
+
+class FakeReader:
+    # LatestFrameReader stand-in: read() returns a fresh (frame, t) while live, None otherwise
+    def __init__(self, source, fps=0, notify=None, name=None):
+        self.source, self.live = source, source != 'idle'
+
+    def read(self, timeout=None):
+        return (self.source, time.time()) if self.live else None
+
+    def close(self):
+        pass
+
+
+class Gate:
+    # MotionGate stand-in that rejects every frame
+    def __call__(self, im0, t=None):
+        return False
+
+
+@pytest.fixture
+def make_server(monkeypatch):
+    monkeypatch.setattr(server, 'LatestFrameReader', FakeReader)
+
+    def make(sources, gated=(), **kwargs):
+        s = InferenceServer(imgsz=(64, 64), model=StubModel(), **kwargs)
+        for i, source in enumerate(sources):
+            s.add_camera(source, handler=None, gate=Gate() if i in gated else None)
+        s.running = True
+        return s
+
+    return make
+
+
+def cams(batch):
+    return [cam for cam, _, _ in batch]
+
+
+def test_max_batch(make_server):
+    s = make_server(['a', 'b', 'c', 'd', 'e'], max_batch=2, max_wait_ms=1000)
+    t = time.time()
+    batch = s._batch()
+    assert len(batch) == 2 and len(set(cams(batch))) == 2
+    assert time.time() - t < 0.5  # full batch returns without waiting
+
+
+def test_no_repeat_within_batch(make_server):
+    s = make_server(['a', 'idle', 'idle'], max_batch=4, max_wait_ms=100)
+    t = time.time()
+    assert cams(s._batch()) == [0]  # camera 0 is always fresh but joins once
+    assert time.time() - t >= 0.09  # waited for the other cameras until max_wait
+
+
+def test_round_robin(make_server):
+    s = make_server(['a', 'b', 'c'], max_batch=1)
+    seen = [cams(s._batch())[0] for _ in range(6)]
+    assert set(seen[:3]) == set(seen[3:]) == {0, 1, 2}  # every camera takes its turn
+
+
+def test_gated_camera_counts_as_due(make_server):
+    s = make_server(['a', 'b'], gated=[1], max_batch=4, max_wait_ms=5000)
+    t = time.time()
+    assert cams(s._batch()) == [0]
+    assert time.time() - t < 1  # camera 1 was gated, no reason to wait for it
+
+
+def test_stopping(make_server):
+    s = make_server(['idle'])
+    s.running = False
+    assert s._batch() == []
@@ -0,0 +1,64 @@
+"""LatestFrameReader stall recovery and LoadLatestStreams fresh frames, with fake captures whose read() blocks."""
+
+import threading
+import time
+
+import pytest
+
+from streams import LatestFrameReader, LoadLatestStreams
+
+
+class Capture:
+    # cv2.VideoCapture stand-in: returns frames at 100 FPS, then blocks in read() like a stalled stream until unblocked
+    def __init__(self, frames, unblock):
+        self.frames, self.unblock = list(frames), unblock
+
+    def read(self):
+        if self.frames:
+            time.sleep(0.01)
+            return True, self.frames.pop(0)
+        self.unblock.wait()
+        return False, None
+
+    def release(self):
+        pass
+
+
+@pytest.fixture
+def captures(monkeypatch):
+    # source -> frames of each successive open; unblocks every stalled read at teardown
+    caps, unblock = {}, threading.Event()
+    def open(self):
+        return Capture((caps.get(self.source) or [()]).pop(0), unblock)
+
+    monkeypatch.setattr(LatestFrameReader, '_open', open)
+    yield caps
+    unblock.set()
+
+
+def test_restart_abandons_stalled_read(captures):
+    captures['cam'] = [['a'], ['b']]
+    reader = LatestFrameReader('cam')
+    assert reader.read(timeout=1)[0] == 'a'
+    assert reader.read(timeout=0.2) is None  # stalled in read()
+    reader.restart()
+    assert reader.read(timeout=1)[0] == 'b'  # from the new capture while the old thread is still blocked
+    assert reader.stats()['reconnects'] == 1
+    reader.running = False
+
+
+def test_no_first_frame_ages():
+    reader = LatestFrameReader.__new__(LatestFrameReader)
+    reader.seq, reader.opened = 0, time.time() - 5
+    assert 5 <= reader.age() < 6  # stalled since the open, not inf/None, so the supervisor restarts it
+
+
+def test_stale_source_not_fresh(captures, tmp_path):
+    captures.update(a=[range(1000)], b=[['b']])  # b stalls after its first frame
+    file = tmp_path / 'cams.streams'
+    file.write_text('a\nb')
+    dataset = LoadLatestStreams(str(file), raw=True, timeout=0.2)
+    _, _, im0, _, _ = next(iter(dataset))
+    assert dataset.fresh == [True, False] and im0[1] == 'b'  # b repeats its last frame, marked as not fresh
+    for r in dataset.readers:
+        r.running = False
@@ -0,0 +1,47 @@
+"""IoUTracker K-of-N confirmation and per-object deduplication."""
+
+import torch
+
+from temporal import IoUTracker
+
+A = torch.tensor([[10., 10., 50., 50.]])
+B = torch.tensor([[200., 200., 260., 260.]])
+A_MOVED = A + 4  # same object a few pixels later, IoU > 0.3
+
+
+def confirm(tracker, frames):
+    # Feed frames (boxes or None), marking confirmed tracks alerted as IncidentHandler does; return ids per frame
+    out = []
+    for boxes in frames:
+        tracks = tracker.update(boxes)
+        for t in tracks:
+            t.alerted = True
+        out.append([t.id for t in tracks])
+    return out
+
+
+def test_k_of_n():
+    assert confirm(IoUTracker(k=3, n=5), [A, A_MOVED, A]) == [[], [], [0]]
+    assert confirm(IoUTracker(k=3, n=5), [A, None, A, None, A]) == [[], [], [], [], [0]]  # dropouts are bridged
+    assert confirm(IoUTracker(k=3, n=3), [A, None, A, None, A]) == [[], [], [], [], []]  # never 3 of the last 3
+
+
+def test_persisting_object_alerts_once():
+    ids = confirm(IoUTracker(k=2, n=3), [A] * 10)
+    assert ids == [[], [0]] + [[]] * 8
+
+
+def test_objects_tracked_separately():
+    ids = confirm(IoUTracker(k=2, n=3), [A, A, torch.cat([A, B]), torch.cat([A, B]), torch.cat([A, B])])
+    assert ids == [[], [0], [], [1], []]  # B is a new object and alerts once on its own
+
+
+def test_expired_track_restarts():
+    tracker = IoUTracker(k=1, n=1, max_age=2)
+    assert confirm(tracker, [A, None, None, None, A]) == [[0], [], [], [], [1]]  # unmatched for > max_age frames
+    assert len(tracker.tracks) == 1
+
+
+def test_unmatched_track_not_returned():
+    tracker = IoUTracker(k=2, n=5)
+    assert [[t.id for t in tracker.update(x)] for x in (A, A, None, A)] == [[], [0], [], [0]]  # not alerted (cooldown)
@@ -0,0 +1,62 @@
+"""IncidentUploader against the offline Firebase stand-ins: drop-oldest overflow and stage-resuming retries."""
+
+import time
+
+from fake_firebase import FakeBucket, FakeDB
+from rtdb import RTDBWriter
+from uploader import IncidentUploader
+
+
+class FlakyRTDB:
+    # RTDBWriter stand-in whose first `fail` index() calls raise
+    def __init__(self, fail=0):
+        self.fail, self.calls = fail, 0
+
+    def index(self, *args, **kwargs):
+        self.calls += 1
+        if self.fail:
+            self.fail -= 1
+            raise ConnectionError('FlakyRTDB injected failure')
+
+
+def test_drop_oldest():
+    bucket, rtdb = FakeBucket(latency=0.3), RTDBWriter(FakeDB())
+    uploader = IncidentUploader(bucket, rtdb, workers=1, maxsize=2)
+    uploader.submit('fire', 'f0.jpg', b'0')
+    time.sleep(0.1)  # f0 is being uploaded, the queue is empty
+    for i in range(1, 5):
+        uploader.submit('fire', f'f{i}.jpg', str(i).encode())  # f3 and f4 push out f1 and f2
+    uploader.close()
+    rtdb.close()
+    assert uploader.metrics()['dropped'] == 2
+    assert sorted(bucket.files) == ['fire_img/f0.jpg', 'fire_img/f3.jpg', 'fire_img/f4.jpg']
+
+
+def test_retry_upload():
+    bucket = FakeBucket(fail=2)
+    uploader = IncidentUploader(bucket, FlakyRTDB(), retries=3, backoff=0.01)
+    uploader.submit('weapon', 'w.jpg', b'w')
+    uploader.close()
+    assert bucket.calls == 3
+    assert list(bucket.files) == ['weapon_img/w.jpg']
+    assert uploader.metrics()['uploaded'] == 1
+
+
+def test_retry_resumes_failed_stage():
+    bucket, rtdb = FakeBucket(), FlakyRTDB(fail=1)
+    uploader = IncidentUploader(bucket, rtdb, retries=3, backoff=0.01)
+    uploader.submit('fire', 'f.jpg', b'f')
+    uploader.close()
+    assert rtdb.calls == 2  # index write retried
+    assert bucket.calls == 1  # upload not repeated
+    assert uploader.metrics()['uploaded'] == 1
+
+
+def test_retries_exhausted():
+    bucket = FakeBucket(fail=10)
+    uploader = IncidentUploader(bucket, FlakyRTDB(), retries=2, backoff=0.01)
+    uploader.submit('fire', 'f.jpg', b'f')
+    uploader.close()
+    m = uploader.metrics()
+    assert bucket.calls == 3 and not bucket.files
+    assert (m['uploaded'], m['failed']) == (0, 1)
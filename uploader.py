@@ -0,0 +1,188 @@
+"""
+Background dispatcher that moves incident snapshot uploads and Firebase writes off the detection loop.
+
+Usage:
+    uploader = IncidentUploader(bucket, RTDBWriter(db), workers=2, maxsize=16, save_dir='runs/detect/incidents')
+    uploader.submit('fire', 'fire_20240101_120000_1.jpg', jpeg_bytes, prefix='fire_img')
+    uploader.close()
+
+    uploader = IncidentUploader(bucket, rtdb, journal=EventJournal('runs/journal.db'))  # durable, drains backlog
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from pathlib import Path
+
+from metrics import STAGE
+from rtdb import push_id
+from utils.general import LOGGER
+
+
+class IncidentUploader:
+    # Bounded upload queue served by a small thread pool, with retry/backoff and a drop-oldest overflow policy. With
+    # a journal.EventJournal every job is journaled first, and failed or dropped jobs are resubmitted from it later
+    def __init__(self, bucket, rtdb, workers=2, maxsize=16, retries=3, backoff=0.5, save_dir=None, history=100,
+                 journal=None, sync_interval=30.0):
+        self.bucket, self.rtdb = bucket, rtdb
+        self.journal, self.sync_interval = journal, sync_interval  # seconds between backlog drains
+        self.save_dir = Path(save_dir) if save_dir else None  # optional local copy of every snapshot
+        self.retries, self.backoff = retries, backoff
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.lock = threading.Lock()
+        self.latency = deque(maxlen=history)  # seconds from frame capture (or submit) to completion, recent live jobs
+        self.submitted = self.uploaded = self.reindexed = self.failed = self.dropped = self.resubmitted = 0
+        self.inflight = set()  # journal ids queued or being processed
+        self.stopping = threading.Event()
+        self.threads = [threading.Thread(target=self._work, daemon=True) for _ in range(workers)]
+        for t in self.threads:
+            t.start()
+        self.syncer = threading.Thread(target=self._sync, daemon=True) if journal else None
+        if self.syncer:
+            self.syncer.start()
+
+    def submit(self, kind, name, data, prefix=None, camera='all', t0=None, content_type='image/jpeg'):
+        """Queue encoded bytes (a JPEG snapshot by default) for upload to '<prefix>/<name>' (default prefix
+        '<kind>_img'), indexed in the RTDB under the same prefix once uploaded. t0 is the frame capture time latency
+        is measured from."""
+        prefix = prefix or f'{kind}_img'
+        job = {'kind': kind, 'name': name, 'data': data, 'prefix': prefix, 'camera': str(camera), 'stage': 0,
+               't': t0 or time.time(), 'content_type': content_type, 'key': push_id(), 'id': None, 'live': True}
+        with self.lock:  # journaled and marked in flight at once, so the syncer cannot queue the new row too
+            if self.journal:
+                try:
+                    job['id'] = self.journal.append(job)
+                    self.inflight.add(job['id'])
+                except Exception as e:  # a broken journal must not stop the live upload
+                    LOGGER.warning(f"WARNING ⚠️ could not journal {name}: {e}")
+            self.submitted += 1
+        self._enqueue(job)
+
+    def _enqueue(self, job, replay=False):
+        # Returns False for a replayed journal event that is already queued or being processed
+        with self.lock:
+            if job['id'] is not None:
+                if replay and job['id'] in self.inflight:
+                    return False
+                self.inflight.add(job['id'])
+            while True:
+                try:
+                    self.queue.put_nowait(job)
+                    break
+                except queue.Full:
+                    try:
+                        old = self.queue.get_nowait()  # drop oldest so the newest incident always gets through
+                        self.queue.task_done()
+                        self.inflight.discard(old['id'])  # still journaled, the syncer will resubmit it
+                        self.dropped += 1
+                        LOGGER.warning(f"WARNING ⚠️ upload queue full, dropped {old['name']}")
+                    except queue.Empty:
+                        pass
+            return True
+
+    def _sync(self):
+        # Resubmit journaled events that were dropped, failed or left over from a previous run, oldest first, while
+        # keeping half of the queue free for live incidents. Events whose index write is already staged in the RTDB
+        # writer are left to its retries, so an RTDB outage does not replay them every pass and starve newer events
+        while True:
+            room = (self.queue.maxsize or 32) // 2 - self.queue.qsize()
+            if room > 0:
+                try:
+                    with self.lock:
+                        exclude = set(self.inflight)
+                    jobs = self.journal.pending(room, exclude, self.rtdb.staged())
+                except Exception as e:
+                    LOGGER.warning(f'WARNING ⚠️ journal read failed: {e}')
+                    jobs = []
+                n = sum(self._enqueue(job, replay=True) for job in jobs)  # in flight since the journal read: skipped
+                with self.lock:
+                    self.resubmitted += n
+            if self.stopping.wait(self.sync_interval):
+                break
+
+    def _work(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                self.queue.task_done()
+                break
+            upload = job['stage'] < 2  # False for a journaled event that only needs its RTDB index replayed
+            for i in range(self.retries + 1):
+                try:
+                    self._process(job)
+                    with self.lock:
+                        self.uploaded += upload
+                        self.reindexed += not upload
+                        if job.get('live'):  # replayed events would report their outage as latency
+                            self.latency.append(time.time() - job['t'])
+                    break
+                except Exception as e:
+                    if i == self.retries:
+                        with self.lock:
+                            self.failed += 1
+                        LOGGER.warning(f"WARNING ⚠️ upload of {job['name']} failed after {i + 1} attempts: {e}")
+                    else:
+                        time.sleep(self.backoff * 2 ** i)
+            with self.lock:
+                self.inflight.discard(job['id'])
+            self.queue.task_done()
+
+    def _process(self, job):
+        # Stages are resumed on retry so a failed step never repeats what already succeeded
+        kind, name, prefix = job['kind'], job['name'], job['prefix']
+        if job['stage'] < 1:
+            if self.save_dir:
+                self._save(job)
+            job['stage'] = 1
+        if job['stage'] < 2:
+            with STAGE.time(job['camera'], 'upload'):
+                self.bucket.blob(f'{prefix}/{name}').upload_from_string(job['data'], content_type=job['content_type'])
+            job['stage'] = 2
+            if self.journal and job['id'] is not None:
+                self.journal.uploaded(job['id'])
+        self.rtdb.index(kind, name, prefix, job['key'])  # staged, sent with the next coalesced RTDB update
+        job['stage'] = 3
+
+    def _save(self, job):
+        # Local disk sink is best-effort, a full or read-only disk must not block the upload
+        try:
+            f = self.save_dir / job['prefix'] / job['name']
+            f.parent.mkdir(parents=True, exist_ok=True)
+            f.write_bytes(job['data'])
+        except OSError as e:
+            LOGGER.warning(f"WARNING ⚠️ could not save {job['name']} to {self.save_dir}: {e}")
+
+    def metrics(self):
+        """Return queue depth, job counters and upload latency statistics (ms)."""
+        with self.lock:
+            lat = list(self.latency)
+            return {
+                'queue_depth': self.queue.qsize(),
+                'submitted': self.submitted,
+                'uploaded': self.uploaded,
+                'reindexed': self.reindexed,
+                'failed': self.failed,
+                'dropped': self.dropped,
+                'resubmitted': self.resubmitted,
+                'latency_ms_avg': sum(lat) / len(lat) * 1E3 if lat else 0.0,
+                'latency_ms_max': max(lat) * 1E3 if lat else 0.0}
+
+    def close(self, timeout=10.0):
+        """Drain pending uploads (up to timeout seconds) and stop the workers. Journaled jobs left over are resubmitted
+        on the next start."""
+        self.stopping.set()
+        if self.syncer:
+            self.syncer.join()
+        deadline = time.time() + timeout
+        while self.queue.unfinished_tasks and time.time() < deadline:
+            time.sleep(0.05)
+        with self.lock:
+            while not self.queue.empty():  # abandon whatever did not make it before the deadline
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+        for _ in self.threads:
+            self.queue.put(None)
+        for t in self.threads:
+            t.join(max(deadline - time.time(), 0.1))